@@ -9,7 +9,9 @@
 # Para ejecutar:
 # 1. Asegúrate de tener PyInstaller: pip install pyinstaller
 # 2. Ejecuta este script desde la raíz: python build.py
+#    (usa --clean para forzar una compilación desde cero)
 
+import argparse
 import os
 import platform
 import shutil
@@ -62,18 +64,28 @@ def run_pyinstaller():
         'pyinstaller',
         '--onefile',
         '--windowed',
+        '--noconfirm',        # Reutilizar salidas anteriores sin preguntar
         '--name', APP_NAME,
         '--distpath', DIST_PATH,  # Dónde poner el .exe/.app final
         '--workpath', BUILD_PATH, # Dónde poner los archivos temporales
         '-p', SRC_DIR,            # Dónde encontrar los imports (file_merger, etc.)
+        '--hidden-import', 'python_calamine',  # Motor rápido de lectura de Excel
+        '--hidden-import', 'pyarrow',          # Strings Arrow y caché Parquet
         MAIN_SCRIPT               # El script principal
     ]
 
     print(f"Ejecutando comando: {' '.join(command)}")
 
+    # Reutilizar los .pyc entre compilaciones para acelerar la fase de
+    # análisis de PyInstaller en reconstrucciones.
+    env = os.environ.copy()
+    pycache_dir = os.path.join(PROJECT_ROOT, '.pycache')
+    os.makedirs(pycache_dir, exist_ok=True)
+    env['PYTHONPYCACHEPREFIX'] = pycache_dir
+
     try:
         # Ejecutar el comando
-        subprocess.run(command, check=True)
+        subprocess.run(command, check=True, env=env)
         print("\n--- ¡Compilación exitosa! ---")
         print(f"Archivo final guardado en: {DIST_PATH}")
 
@@ -100,7 +112,16 @@ def final_cleanup():
 
 # --- Flujo Principal ---
 if __name__ == "__main__":
-    clear_old_builds()
+    parser = argparse.ArgumentParser(description="Compila la aplicación ReportesCASA con PyInstaller.")
+    parser.add_argument('--clean', action='store_true',
+                        help="Borra la caché de compilación y compila desde cero.")
+    args = parser.parse_args()
+
+    # Por defecto la compilación es incremental: conservar build_temp/ y el
+    # archivo .spec permite que PyInstaller reutilice su análisis anterior.
+    if args.clean:
+        clear_old_builds()
     run_pyinstaller()
-    final_cleanup()
+    if args.clean:
+        final_cleanup()
     print("\nProceso de 'build' completado.")
\ No newline at end of file
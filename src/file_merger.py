@@ -16,6 +16,9 @@
 
 # ================================================ IMPORTS ============================================================
 
+import atexit
+import functools
+
 import pandas as pd
 import os
 import logger
@@ -32,13 +35,28 @@ except ImportError:
         'ADMITIDOS_FILE': '../data/raw/admitidos.xlsx',
         'PROCESSED_DIR': '../data/procesada/',
         'CONSOLIDATED_FILE': '../data/procesada/base_consolidada.xlsx',
+        'CONSOLIDATED_PARQUET': '../data/procesada/base_consolidada.parquet',
         'STUDENT_MAP_FILE': '../data/procesada/student_program_map.csv'
     })()
 
+# Copy-on-Write avoids the hidden defensive copies pandas 2.x makes across
+# the merge/clean pipeline (it is the default behavior in pandas 3.x).
+try:
+    pd.set_option('mode.copy_on_write', True)
+except Exception:
+    pass
+
 # ================================================ CONSTANTS ==========================================================
 
+# Bumped whenever the consolidation pipeline changes behavior; logged at
+# run start so packaged builds confirm which module version they bundle.
+__version__ = '1.1.0'
+
 log = logger.Logger()
 
+# Keep writing the human-readable .xlsx copy next to the Parquet output.
+EXPORT_XLSX = True
+
 
 # ================================================ MAIN FUNCTION ======================================================
 
@@ -47,9 +65,14 @@ def generate_consolidated_file() -> bool:
     Generate a consolidated Excel file by merging base and admitidos files.
     :return: True if the file was generated successfully, False otherwise.
     """
+    log.info(f'file_merger {__version__} starting consolidation...')
     try:
         # Load files
         base_df, admitidos_df = load_files()
+        # Normalize the student-code join key once; both the merge and the
+        # student-program map reuse the same normalized keys.
+        admitidos_df['CODIGO'] = normalize_codes(admitidos_df['CODIGO'])
+        base_df['Código del estudiante'] = normalize_codes(base_df['Código del estudiante'])
         # Create processed folder if it doesn't exist
         create_processed_folder()
         # Create the student-program map for the report generator
@@ -58,8 +81,9 @@ def generate_consolidated_file() -> bool:
         consolidated_df = merge_dataframes(base_df, admitidos_df)
         # Clean the consolidated DataFrame
         consolidated_df = clean_data(consolidated_df)
-        # Save the consolidated DataFrame to an Excel file
-        consolidated_df.to_excel(paths.CONSOLIDATED_FILE, index=False)
+        # Save the consolidated DataFrame: Parquet for the report generator
+        # (fast columnar reads) and optionally Excel for human viewing.
+        save_consolidated(consolidated_df)
     except Exception as e:
         log.error(f'Error generating consolidated file: {e}')
         return False
@@ -69,17 +93,179 @@ def generate_consolidated_file() -> bool:
 
 # =============================================== AUXILIARY FUNCTIONS =================================================
 
+# Workbooks kept open by the read cache; closed explicitly at exit.
+_CACHED_WORKBOOKS = []
+
+
+@functools.lru_cache(maxsize=4)
+def _open_workbook(path: str):
+    """
+    Open a workbook in read_only/data_only mode, caching the parsed zip
+    container so repeated reads of the same file (e.g. several sheets or
+    several consumers of admitidos.xlsx) share a single parse.
+    :param path: Path to the Excel file.
+    :return: The openpyxl workbook.
+    """
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    _CACHED_WORKBOOKS.append(wb)
+    return wb
+
+
+@atexit.register
+def _close_cached_workbooks() -> None:
+    """
+    Close any workbooks still held by the read cache at interpreter exit.
+    :return: None
+    """
+    while _CACHED_WORKBOOKS:
+        try:
+            _CACHED_WORKBOOKS.pop().close()
+        except Exception:
+            pass
+
+
+def _read_excel_readonly(path: str, usecols: list = None) -> pd.DataFrame:
+    """
+    Read an Excel file through openpyxl in read_only/data_only mode, which
+    streams rows instead of building the full cell graph (an order of
+    magnitude faster and lighter on large workbooks).
+    :param path: Path to the Excel file.
+    :param usecols: Optional list of column names to keep.
+    :return: The loaded DataFrame.
+    """
+    wb = _open_workbook(path)
+    rows = wb.active.values
+    cols = next(rows)
+    df = pd.DataFrame(rows, columns=cols)
+    if usecols is not None:
+        df = df[[c for c in usecols if c in df.columns]]
+    return df
+
+
+def _read_excel(path: str, **kwargs) -> pd.DataFrame:
+    """
+    Read an Excel file, preferring the Rust-based 'calamine' engine which is
+    much faster than openpyxl. Falls back to openpyxl in read_only mode when
+    python-calamine is not installed (or pandas is too old to know it).
+    :param path: Path to the Excel file.
+    :param kwargs: Extra arguments forwarded to pd.read_excel.
+    :return: The loaded DataFrame.
+    """
+    try:
+        return pd.read_excel(path, engine='calamine', **kwargs)
+    except (ImportError, ValueError):
+        log.warning("Engine 'calamine' not available, falling back to openpyxl read-only mode.")
+        return _read_excel_readonly(path, usecols=kwargs.get('usecols'))
+
+
+def _cache_key(path: str) -> str:
+    """
+    Build a cheap staleness key for an input file from its mtime and size.
+    :param path: Path to the input file.
+    :return: The key string.
+    """
+    return f'{os.path.getmtime(path)}-{os.path.getsize(path)}'
+
+
+def _load_excel_cached(path: str, **kwargs) -> pd.DataFrame:
+    """
+    Load an Excel file through a Parquet sidecar cache. The first read parses
+    the workbook and writes a .parquet copy next to it (keyed by mtime+size);
+    later runs read the Parquet directly, which is orders of magnitude faster.
+    Falls back silently to a plain Excel read if Parquet support is missing.
+    :param path: Path to the Excel file.
+    :param kwargs: Extra arguments forwarded to pd.read_excel.
+    :return: The loaded DataFrame.
+    """
+    cache_path = os.path.splitext(path)[0] + '.parquet'
+    key_path = cache_path + '.cache_key'
+    try:
+        key = _cache_key(path)
+        if os.path.exists(cache_path) and os.path.exists(key_path):
+            with open(key_path) as f:
+                if f.read().strip() == key:
+                    log.info(f'Loading cached Parquet copy of {os.path.basename(path)}.')
+                    return pd.read_parquet(cache_path)
+    except Exception as e:
+        log.warning(f'Could not check Parquet cache for {path}: {e}')
+
+    df = _read_excel(path, **kwargs)
+    try:
+        df.to_parquet(cache_path, compression='zstd')
+        with open(key_path, 'w') as f:
+            f.write(_cache_key(path))
+        log.info(f'Parquet cache written for {os.path.basename(path)}.')
+    except Exception as e:
+        log.warning(f'Could not write Parquet cache for {path}: {e}')
+    return df
+
+
+# Repeated-value text columns worth storing as category (matched lowercase).
+CATEGORY_COLUMNS = {'competencia', 'programa', 'meta de aprendizaje'}
+
+
+def downcast_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcast columns to cheaper dtypes right after load: scores to float32,
+    periods to nullable Int32 and repeated-value text columns to category.
+    Smaller columns proportionally speed up every downstream operation.
+    :param df: DataFrame to downcast (modified in place).
+    :return: The downcast DataFrame.
+    """
+    for col in df.columns:
+        lc = str(col).strip().lower()
+        try:
+            if lc in CATEGORY_COLUMNS:
+                df[col] = df[col].astype('category')
+            elif lc == 'periodo':
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int32')
+            elif lc == 'puntaje criterio':
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+        except Exception as e:
+            log.warning(f'Could not downcast column "{col}": {e}')
+    return df
+
+
 def load_files() -> tuple:
     """
     Load the base and admitidos Excel files into DataFrames.
+    Only the columns actually consumed downstream are read from admitidos.
     :return: A tuple containing the base DataFrame and the admitidos DataFrame.
     """
-    base_df = pd.read_excel(paths.BASE_FILE)
-    admitidos_df = pd.read_excel(paths.ADMITIDOS_FILE)
+    base_df = downcast_dtypes(_load_excel_cached(paths.BASE_FILE))
+    admitidos_df = downcast_dtypes(
+        _load_excel_cached(paths.ADMITIDOS_FILE, usecols=['CODIGO', 'PERIODO', 'PROGRAMA']))
     log.info('Files loaded successfully.')
     return base_df, admitidos_df
 
 
+def save_consolidated(consolidated_df: pd.DataFrame) -> None:
+    """
+    Save the consolidated DataFrame. Parquet is the primary output (read by
+    the report generator); the Excel copy is kept for human viewing and as a
+    fallback when Parquet support is unavailable.
+    :param consolidated_df: The consolidated DataFrame to save.
+    :return: None
+    """
+    # El Excel se escribe PRIMERO y el Parquet al final: el generador
+    # descarta el Parquet si el xlsx tiene mtime más reciente, así que el
+    # orden inverso invalidaba la caché en cada consolidación.
+    wrote_xlsx = False
+    if EXPORT_XLSX:
+        consolidated_df.to_excel(paths.CONSOLIDATED_FILE, index=False)
+        wrote_xlsx = True
+        log.info(f'Consolidated Excel saved to {paths.CONSOLIDATED_FILE}')
+    try:
+        consolidated_df.to_parquet(paths.CONSOLIDATED_PARQUET, index=False)
+        log.info(f'Consolidated Parquet saved to {paths.CONSOLIDATED_PARQUET}')
+    except Exception as e:
+        log.warning(f'Could not write consolidated Parquet: {e}')
+        if not wrote_xlsx:
+            consolidated_df.to_excel(paths.CONSOLIDATED_FILE, index=False)
+            log.info(f'Consolidated Excel saved to {paths.CONSOLIDATED_FILE}')
+
+
 def create_processed_folder() -> None:
     """
     Create the processed folder if it doesn't exist.
@@ -89,6 +275,19 @@ def create_processed_folder() -> None:
     log.info('Processed folder created.')
 
 
+def normalize_codes(sr: pd.Series) -> pd.Series:
+    """
+    Normalize a student-code column to a canonical string form so that keys
+    from base.xlsx and admitidos.xlsx compare equal regardless of whether
+    Excel delivered them as ints, floats or strings.
+    :param sr: Series of student codes.
+    :return: Series of normalized string codes.
+    """
+    as_num = pd.to_numeric(sr, errors='coerce')
+    as_str = sr.astype('string').str.strip()
+    return as_str.mask(as_num.notna(), as_num.astype('Int64').astype('string'))
+
+
 def merge_dataframes(base_df: pd.DataFrame, admitidos_df: pd.DataFrame) -> pd.DataFrame:
     """
     Merge two DataFrames on the student ID column.
@@ -96,32 +295,28 @@ def merge_dataframes(base_df: pd.DataFrame, admitidos_df: pd.DataFrame) -> pd.Da
     :param admitidos_df: Admitidos DataFrame.
     :return: Merged DataFrame.
     """
-    adm = admitidos_df[['CODIGO', 'PERIODO']].copy()
-
-    def to_str_period(x):
-        if pd.isna(x):
-            return None
-        if isinstance(x, (int, float)) and not isinstance(x, bool):
-            try:
-                return str(int(x))
-            except Exception:
-                return str(x)
-        return str(x)
-
-    def last_digit_to_zero(s):
-        if s is None:
-            return None
-        s = s.strip()
-        return s[:-1] + '0' if len(s) >= 1 else '0'
-
-    adm['PERIODO'] = adm['PERIODO'].apply(to_str_period).apply(last_digit_to_zero).astype("int64")
-
-    df = base_df.merge(
-        adm,
-        left_on='Código del estudiante',
-        right_on='CODIGO',
-        how='left'
-    ).rename(columns={'PERIODO': 'Cohorte Real'}).drop(columns=['CODIGO'])
+    # Under Copy-on-Write this slice is a lazy view; no defensive copy needed.
+    adm = admitidos_df[['CODIGO', 'PERIODO']]
+
+    # Normalize PERIODO (zero out the last digit) arithmetically — no string
+    # round-trip needed: 20251 -> 20250 is just (periodo // 10) * 10.
+    adm['PERIODO'] = (pd.to_numeric(adm['PERIODO'], errors='coerce').astype('Int64') // 10) * 10
+
+    # Equivalent of merge(validate='many_to_one'): surface student codes
+    # that map to more than one cohort instead of silently keeping the first.
+    periods_per_code = adm.groupby('CODIGO', observed=True)['PERIODO'].nunique()
+    conflicting = periods_per_code[periods_per_code > 1]
+    if not conflicting.empty:
+        log.warning(f'{len(conflicting)} student codes map to more than one PERIODO '
+                    f'in admitidos; keeping the first occurrence for each.')
+
+    # One PERIODO per CODIGO: a plain dict lookup via Series.map is much
+    # cheaper than a hash join, and needs no rename/drop afterwards.
+    adm = adm.drop_duplicates(subset=['CODIGO'])
+    periodo_map = dict(zip(adm['CODIGO'], adm['PERIODO']))
+
+    df = base_df.copy()
+    df['Cohorte Real'] = df['Código del estudiante'].map(periodo_map)
 
     log.info('Merging completed successfully.')
     return df
@@ -136,9 +331,23 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     # Put all column names to lowercase and strip spaces
     df.columns = df.columns.str.lower()
 
-    # Remove duplicates and rows with null values in critical columns
-    df = df.drop_duplicates()
-    df = df[df['cohorte real'].notnull() & df['puntaje criterio'].notnull()]
+    # Move object-dtype text columns onto Arrow-backed string arrays so the
+    # .str kernels below run in C++ instead of per-PyObject loops.
+    try:
+        import pyarrow  # noqa: F401 - only probing availability
+        string_dtype = 'string[pyarrow]'
+    except ImportError:
+        string_dtype = 'string'
+    for col in df.columns[df.dtypes == object]:
+        try:
+            df[col] = df[col].astype(string_dtype)
+        except Exception as e:
+            log.warning(f'Could not convert column "{col}" to {string_dtype}: {e}')
+
+    # Filter rows with null critical columns first, then deduplicate the
+    # surviving rows in a single pass (one materialization instead of two).
+    mask = df['cohorte real'].notna() & df['puntaje criterio'].notna()
+    df = df.loc[mask].drop_duplicates(ignore_index=True)
 
     # Remove codes from objetivo de aprendizaje and código y nombre del criterio
     df['objetivo de aprendizaje'] = remove_codes(df['objetivo de aprendizaje'])
@@ -148,8 +357,9 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     df = df.rename(columns={'código y nombre del criterio': 'nombre del criterio'})
     log.info(f'Column "código y nombre del criterio" renamed to "nombre del criterio"')
 
-    # Standardize competencia column values
-    df['competencia'] = df['competencia'].apply(lambda x: x.strip().upper() if isinstance(x, str) else x)
+    # Standardize competencia column values with vectorized string kernels
+    # and keep it categorical so validity checks only touch unique levels.
+    df['competencia'] = df['competencia'].astype('string').str.strip().str.upper().astype('category')
     # Check validity of competencia column
     check_competencia_validity(df)
 
@@ -164,16 +374,11 @@ def remove_codes(sr: pd.Series) -> pd.Series:
     :return: Series with codes removed.
     """
     if sr.name == 'objetivo de aprendizaje':
-        sr = sr.str.split(' ')
-        # Remove the first token only when the first token contains a '-'
-        sr = sr.apply(
-            lambda x: ' '.join(x[1:]) if isinstance(x, list) and x and '-' in str(x[0]) else (
-                ' '.join(x) if isinstance(x, list) else x)
-        )
+        # Strip the first token only when it contains a '-' (a code prefix).
+        sr = sr.str.replace(r'^\S*-\S*\s+', '', regex=True)
     elif sr.name == 'código y nombre del criterio':
-        sr = sr.str.split('|')
-        if len(sr) > 0:
-            sr = sr.apply(lambda x: ' '.join(x[1:]) if isinstance(x, list) else x)
+        # Keep everything after the first '|' separator.
+        sr = sr.str.split('|', n=1).str[1].str.strip().fillna('')
     log.info(f'Codes removed from column: {sr.name}')
     return sr
 
@@ -189,8 +394,13 @@ def check_competencia_validity(df: pd.DataFrame) -> None:
     # and from the 'Diccionario' ('ET', 'CO-E', 'CO-O').
     valid_competencias = {'ET', 'CO-E', 'CO-O', 'PC', 'TD', 'CO', 'IT', 'LI', 'AI', 'TE', 'PG'}
 
-    # Find unique values in the 'competencia' column that are not in the valid set
-    actual_competencias = set(df['competencia'].dropna().astype(str).str.strip().str.upper().unique())
+    # Find unique values in the 'competencia' column that are not in the valid set.
+    # With a categorical column this only iterates the unique levels.
+    competencia = df['competencia']
+    if isinstance(competencia.dtype, pd.CategoricalDtype):
+        actual_competencias = set(competencia.cat.categories.astype(str))
+    else:
+        actual_competencias = set(competencia.dropna().astype(str).str.strip().str.upper().unique())
     invalid_competencias = actual_competencias - valid_competencias
 
     if invalid_competencias:
@@ -229,9 +439,10 @@ def create_student_program_map(admitidos_df: pd.DataFrame) -> None:
         student_map_df = admitidos_df[['CODIGO', 'PROGRAMA']].copy()
         student_map_df.columns = ['código del estudiante', 'programa']
 
-        # Apply the mapping
-        original_programs = set(student_map_df['programa'].unique())
-        student_map_df['programa'] = student_map_df['programa'].map(program_mapping)
+        # Apply the mapping (on a categorical column this only maps the
+        # unique levels, not every row)
+        original_programs = set(student_map_df['programa'].dropna().unique())
+        student_map_df['programa'] = student_map_df['programa'].map(program_mapping).astype('string')
 
         # Log any programs that were not in the mapping
         unmapped_programs = {
@@ -242,8 +453,8 @@ def create_student_program_map(admitidos_df: pd.DataFrame) -> None:
             log.warning(f"Unmapped programs found in '{paths.ADMITIDOS_FILE}': "
                         f"{unmapped_programs}. These will be 'NaN' in the map.")
 
-        # Ensure student codes are strings to match 'base.xlsx'
-        student_map_df['código del estudiante'] = student_map_df['código del estudiante'].astype(str)
+        # Student codes were already normalized to strings by
+        # generate_consolidated_file(), so no per-row cast is needed here.
 
         # Remove any duplicates to create a clean 1-to-1 map (student-to-program)
         student_map_df = student_map_df.drop_duplicates(subset=['código del estudiante'])
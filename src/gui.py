@@ -9,11 +9,15 @@
 # y la generación de reportes de forma secuencial.
 
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
+from tkinter import ttk, messagebox
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import sys
 import os
 import logging  # <-- 1. IMPORTAR LOGGING
+import logging.handlers
+import queue
+import re
 
 # --- IMPORTANTE ---
 # Importa la configuración de rutas PRIMERO
@@ -22,72 +26,81 @@ try:
 except ImportError:
     print("ERROR CRÍTICO: No se pudo encontrar path_config.py")
 
-# Ahora importa el resto de scripts
+# Ahora importa el resto de scripts.
+# NOTA: file_merger y program_report_generator NO se importan aquí; ambos
+# arrastran pandas/openpyxl/matplotlib y retrasarían varios segundos la
+# primera ventana. Se importan de forma perezosa en run_*_task, dentro
+# del hilo de trabajo.
 try:
-    import file_merger
-    import program_report_generator
     import logger
 except ImportError as e:
+    # messagebox sin raíz crearía un tk.Tk() oculto que queda vivo y
+    # estorba a la raíz real; se usa una raíz temporal y se destruye.
+    _tmp_root = tk.Tk()
+    _tmp_root.withdraw()
     messagebox.showerror("Error de Importación",
                          f"No se pudieron encontrar los scripts del proyecto.\n"
                          f"Asegúrate de que 'gui.py' esté en la carpeta 'src/' "
                          f"junto a 'file_merger.py' y 'program_report_generator.py'.\n"
-                         f"Detalle: {e}")
+                         f"Detalle: {e}",
+                         parent=_tmp_root)
+    _tmp_root.destroy()
     sys.exit(1)
 
 
 # --- 2. NUEVA CLASE PARA MANEJAR LOGS ---
-class TkinterLogHandler(logging.Handler):
-    """
-    Un handler de logging de Python que escribe los mensajes
-    en un widget ScrolledText de Tkinter.
-    """
+# Cada cuántos milisegundos el hilo principal vacía el buffer de salida
+DRAIN_INTERVAL_MS = 100
 
-    def __init__(self, text_widget, root):
-        logging.Handler.__init__(self)
-        self.text_widget = text_widget
-        self.root = root
+# Máximo de líneas retenidas en la consola; el texto más viejo se recorta
+# para que el costo por inserción no crezca con la duración de la sesión
+MAX_LOG_LINES = 5000
 
-    def emit(self, record):
-        """Escribe el log en el widget, de forma thread-safe."""
-        msg = self.format(record)
-        # Usamos root.after() para asegurar que la actualización de la GUI
-        # ocurra en el hilo principal de Tkinter.
-        self.root.after(0, self.thread_safe_write, f"{msg}\n")
+# Secuencias de color ANSI (del ColoredFormatter de logger.py); se eliminan
+# antes de insertar en el widget para que no ensucien ni agranden el texto
+_ANSI_RE = re.compile(r'\x1b\[[0-9;]*m')
 
-    def thread_safe_write(self, msg):
-        """Método para escribir de forma segura en el widget de texto."""
-        try:
-            self.text_widget.configure(state='normal')
-            self.text_widget.insert(tk.END, msg)
-            self.text_widget.see(tk.END)  # Auto-scroll
-            self.text_widget.configure(state='disabled')
-        except tk.TclError:
-            # Pasa si la ventana se cierra mientras se escribe
-            pass
+
+class TkinterLogHandler(logging.handlers.QueueHandler):
+    """
+    Un QueueHandler que encola los mensajes ya formateados en la cola
+    compartida de la GUI. Encolar es una operación de microsegundos en el
+    hilo que registra (sin tocar Tk); el hilo principal de Tkinter vacía
+    la cola periódicamente en un solo lote.
+    """
+
+    def prepare(self, record):
+        """Formatea el registro en el hilo que lo emite."""
+        return self.format(record) + '\n'
 
 
 class TextRedirector:
-    """Redirige la salida de stdout/stderr a un widget de texto de Tkinter."""
+    """
+    Redirige la salida de stdout/stderr al sistema de logging, que es el
+    único 'sink' que escribe en el widget (vía TkinterLogHandler). Así un
+    print() no duplica inserciones en la consola ni compite con los
+    mensajes de logging.
+    """
 
-    def __init__(self, widget, root):
-        self.widget = widget
-        self.root = root
+    def __init__(self, level=logging.INFO):
+        self._logger = logging.getLogger('gui.stdout')
+        self._level = level
+        self._partial = ''
+        self._lock = threading.Lock()
 
     def write(self, s):
-        self.root.after(0, self.thread_safe_write, s)
-
-    def thread_safe_write(self, s):
-        try:
-            self.widget.configure(state='normal')
-            self.widget.insert(tk.END, s)
-            self.widget.see(tk.END)
-            self.widget.configure(state='disabled')
-        except tk.TclError:
-            pass
+        with self._lock:
+            self._partial += s
+            while '\n' in self._partial:
+                line, self._partial = self._partial.split('\n', 1)
+                if line:
+                    self._logger.log(self._level, line)
 
     def flush(self):
-        pass
+        with self._lock:
+            if self._partial:
+                self._logger.log(self._level, self._partial)
+                self._partial = ''
 
 
 class App:
@@ -97,7 +110,14 @@ class App:
         self.root.geometry("750x600")
 
         style = ttk.Style()
-        style.theme_use('clam')
+        # Tema nativo donde exista ('vista'/'aqua' los dibuja el SO);
+        # 'clam' se re-renderiza en Tcl en cada configure y es más caro
+        # durante las inserciones pesadas en la consola.
+        theme = {'win32': 'vista', 'darwin': 'aqua'}.get(sys.platform, 'clam')
+        try:
+            style.theme_use(theme)
+        except tk.TclError:
+            style.theme_use('clam')
 
         main_frame = ttk.Frame(root, padding="10")
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -137,23 +157,90 @@ class App:
         log_frame = ttk.LabelFrame(main_frame, text="Consola de Progreso", padding="10")
         log_frame.pack(fill=tk.BOTH, expand=True, pady=5)
 
-        self.log_area = scrolledtext.ScrolledText(log_frame, state='disabled', height=20, wrap=tk.WORD, bg='black',
-                                                  fg='white')
-        self.log_area.pack(fill=tk.BOTH, expand=True)
+        # El widget queda siempre en estado 'normal' (evita dos configure
+        # por inserción); se vuelve de solo lectura bloqueando el teclado
+        # y el pegado con ratón. Se usa Text + Scrollbar directos (en vez
+        # de ScrolledText) para poder desconectar el yscrollcommand durante
+        # las inserciones en lote.
+        self.log_area = tk.Text(log_frame, height=20, wrap=tk.WORD, bg='black',
+                                fg='white')
+        self.log_scroll = ttk.Scrollbar(log_frame, orient='vertical',
+                                        command=self.log_area.yview)
+        self.log_area.configure(yscrollcommand=self.log_scroll.set)
+        self.log_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.log_area.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.log_area.bind('<Key>', lambda e: 'break')
+        self.log_area.bind('<Button-2>', lambda e: 'break')  # Pegado en X11
 
         # --- 3. ¡SECCIÓN MODIFICADA! ---
+        # Cola compartida entre stdout/stderr y el handler de logging;
+        # un solo bucle `after` en el hilo principal la vacía.
+        self.log_queue = queue.Queue()
+
+        # Un solo hilo de trabajo reutilizable: serializa las tareas (dos
+        # clics no compiten por los datos) y evita crear un hilo por clic.
+        self._pool = ThreadPoolExecutor(max_workers=1,
+                                        thread_name_prefix='casa-task')
+
+        # Antes de reasignar stdout, pasarlo a line-buffering para que
+        # cualquier salida previa/externa fluya de inmediato (en la app
+        # empaquetada con --windowed, sys.stdout puede ser None).
+        for stream in (sys.stdout, sys.stderr):
+            if stream is not None and hasattr(stream, 'reconfigure'):
+                try:
+                    stream.reconfigure(line_buffering=True, write_through=True)
+                except (OSError, ValueError):
+                    pass
+
         # Redirigir stdout/stderr (para capturar print() y errores)
-        redirector = TextRedirector(self.log_area, self.root)
-        sys.stdout = redirector
-        sys.stderr = redirector
+        # hacia logging; solo TkinterLogHandler escribe en el widget.
+        self.redirector = TextRedirector()
+        sys.stdout = self.redirector
+        sys.stderr = TextRedirector(level=logging.ERROR)
 
         # Configurar el logger de Python para que escriba en la GUI
         self.setup_gui_logging()
 
+        # Vaciar el buffer de salida periódicamente desde el hilo principal
+        self.root.after(DRAIN_INTERVAL_MS, self._drain_log)
+
         print("Interfaz iniciada. Listo para comenzar.")
         print(f"Directorio de trabajo actual: {os.getcwd()}")
-        print(f"Raíz del proyecto (PROJECT_ROOT): {paths.PROJECT_ROOT}")
-        print(f"Buscando datos en: {paths.DATA_FOLDER}\n")
+        paths.describe()
+        print()
+
+    def _drain_log(self):
+        """
+        Vacía el buffer de stdout/stderr en el widget de la consola.
+        Se ejecuta en el hilo principal cada DRAIN_INTERVAL_MS; todo lo
+        acumulado se inserta con una sola llamada a `insert`.
+        """
+        parts = []
+        try:
+            while True:
+                parts.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        try:
+            chunk = _ANSI_RE.sub('', ''.join(parts))
+            if chunk:
+                # Desconectar el scrollbar durante las mutaciones para no
+                # pagar un callback de Python por cada inserción/borrado;
+                # se sincroniza una sola vez al final.
+                self.log_area.configure(yscrollcommand='')
+                self.log_area.insert(tk.END, chunk)
+                # Ventana deslizante: recortar el texto viejo para mantener
+                # acotado el costo de cada inserción
+                line_count = int(self.log_area.index('end-1c').split('.')[0])
+                if line_count > MAX_LOG_LINES:
+                    self.log_area.delete('1.0', f'end - {MAX_LOG_LINES} lines')
+                self.log_area.see(tk.END)
+                self.log_area.configure(yscrollcommand=self.log_scroll.set)
+                self.log_scroll.set(*self.log_area.yview())
+        except tk.TclError:
+            # La ventana se está cerrando
+            return
+        self.root.after(DRAIN_INTERVAL_MS, self._drain_log)
 
     def setup_gui_logging(self):
         """
@@ -163,21 +250,16 @@ class App:
         root_logger = logging.getLogger()
         root_logger.setLevel(logging.INFO)  # Nivel mínimo a capturar
 
-        # 1. Quitar el handler de consola (StreamHandler)
-        #    que logger.py añadió en la importación.
-        #    Ese handler está escribiendo en la terminal original (no visible).
-        stream_handler_found = None
-        for handler in root_logger.handlers:
-            if isinstance(handler, logging.StreamHandler):
-                stream_handler_found = handler
-                break
-
-        if stream_handler_found:
-            root_logger.removeHandler(stream_handler_found)
-            print("Handler de consola (logger.py) removido.")
+        # 1. Quitar TODOS los handlers existentes. Buscar por isinstance
+        #    era frágil (FileHandler ES subclase de StreamHandler); aquí
+        #    se instala exactamente lo que la GUI necesita. El handler de
+        #    archivo lo añade logger.Logger() cuando el worker importa el
+        #    pipeline, y ese respeta los handlers ajenos.
+        for handler in list(root_logger.handlers):
+            root_logger.removeHandler(handler)
 
         # 2. Añadir nuestro nuevo handler de GUI (TkinterLogHandler)
-        gui_handler = TkinterLogHandler(self.log_area, self.root)
+        gui_handler = TkinterLogHandler(self.log_queue)
 
         # 3. Definir un formato simple (sin colores ANSI) para la GUI
         formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s',
@@ -190,27 +272,25 @@ class App:
 
     def clear_log(self):
         """Limpia el área de la consola."""
-        self.log_area.configure(state='normal')
         self.log_area.delete('1.0', tk.END)
-        self.log_area.configure(state='disabled')
         print("Consola limpiada.\n")
 
     def start_task(self, task_function, button):
         """
-        Inicia una función (task_function) en un hilo separado
+        Envía una función (task_function) al hilo de trabajo
         y deshabilita el botón (button) mientras corre.
         """
         button.config(state='disabled')
         # No limpiamos el log para poder ver el historial
 
-        threading.Thread(target=self.task_wrapper,
-                         args=(task_function, button),
-                         daemon=True).start()
+        future = self._pool.submit(self.task_wrapper, task_function)
+        future.add_done_callback(
+            lambda f: self.root.after(0, lambda: button.config(state='normal')))
 
-    def task_wrapper(self, task_function, button):
+    def task_wrapper(self, task_function):
         """
-        Envoltorio para las tareas que se ejecutan en hilos.
-        Maneja el éxito/error y reactiva el botón.
+        Envoltorio para las tareas que se ejecutan en el hilo de trabajo.
+        Maneja el éxito/error; el botón se reactiva vía add_done_callback.
         """
         # Usamos logging.info en lugar de print para la consistencia
         logging.info(f"--- Iniciando tarea: {task_function.__name__} ---")
@@ -225,26 +305,33 @@ class App:
 
         except Exception as e:
             logging.error(f"--- ERROR INESPERADO EN LA TAREA ---")
-            logging.error(f"Excepción: {e}")
-            import traceback
-            # traceback.print_exc() irá a sys.stderr, que está redirigido
-            traceback.print_exc()
+            # logging.exception formatea el traceback en el hilo de trabajo
+            # y lo envía por el mismo handler en lotes de la GUI
+            logging.exception(f"Excepción: {e}")
         finally:
-            self.root.after(0, lambda: button.config(state='normal'))
             logging.info(f"--- Proceso finalizado. ---")
 
     def run_consolidar_task(self):
-        """Llama a la tarea de consolidación."""
-        self.start_task(file_merger.generate_consolidated_file, self.consolidar_btn)
+        """Llama a la tarea de consolidación (importa file_merger de forma perezosa)."""
+        def task():
+            import file_merger
+            return file_merger.generate_consolidated_file()
+
+        task.__name__ = 'generate_consolidated_file'
+        self.start_task(task, self.consolidar_btn)
 
     def run_reportes_task(self):
-        """Llama a la tarea de generación de reportes."""
-        self.start_task(program_report_generator.generate_tables_graphs, self.reportes_btn)
+        """Llama a la tarea de generación de reportes (importa el generador de forma perezosa)."""
+        def task():
+            import program_report_generator
+            return program_report_generator.generate_tables_graphs()
+
+        task.__name__ = 'generate_tables_graphs'
+        self.start_task(task, self.reportes_btn)
 
 
 # --- Punto de entrada principal ---
 if __name__ == "__main__":
-    if 'file_merger' in locals() and 'program_report_generator' in locals():
-        root = tk.Tk()
-        app = App(root)
-        root.mainloop()
\ No newline at end of file
+    root = tk.Tk()
+    app = App(root)
+    root.mainloop()
\ No newline at end of file
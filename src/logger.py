@@ -14,14 +14,26 @@
 # ================================================ IMPORTS ============================================================
 
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+
+# The format string only uses asctime/levelname/message, so skip the
+# per-record thread/process lookups and the sys._getframe walk in
+# findCaller; LogRecord construction gets noticeably cheaper in hot loops.
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+logging._srcfile = None
 
 # ================================================ CONSTANTS ==========================================================
 
-LOGS_FOLDER = '../logs'
-LOG_FILE = f'log_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'
-COUNTER = 0
+try:
+    import path_config as _paths
+    LOGS_FOLDER = os.path.join(_paths.PROJECT_ROOT, 'logs')
+except ImportError:
+    LOGS_FOLDER = '../logs'
+
+LOG_FILE_NAME = 'reportes_casa.log'
 
 
 # =============================================== FORMATTER CLASS =====================================================
@@ -64,21 +76,68 @@ class Logger:
         root = logging.getLogger()
         root.setLevel(logging.INFO)
 
-        # Remove existing handlers to avoid duplicate logs
-        if root.handlers:
-            for h in list(root.handlers):
+        # Remove only handlers installed by previous Logger instances, so
+        # two Logger() calls don't duplicate output. Foreign handlers (the
+        # GUI's TkinterLogHandler) are preserved.
+        for h in list(root.handlers):
+            if getattr(h, '_casa_owned', False):
                 root.removeHandler(h)
 
-        # Stream handler (colored)
-        stream_handler = logging.StreamHandler()
-        stream_handler.setLevel(logging.INFO)
-        stream_handler.setFormatter(ColoredFormatter(fmt))
+        # If any foreign handler remains, the GUI owns the console; adding
+        # our own StreamHandler there would write into the redirected
+        # stderr and feed back into logging.
+        gui_active = bool(root.handlers)
+
+        self._buffered_handler = None
+        if not gui_active:
+            # Stream handler (colored), wrapped in a MemoryHandler so INFO
+            # records buffer in memory and flush in blocks instead of paying a
+            # console write per pipeline step. Warnings/errors flush immediately.
+            stream_handler = logging.StreamHandler()
+            stream_handler.setLevel(logging.INFO)
+            stream_handler.setFormatter(ColoredFormatter(fmt))
+
+            buffered_handler = logging.handlers.MemoryHandler(
+                capacity=64, flushLevel=logging.WARNING, target=stream_handler)
+            buffered_handler._casa_owned = True
 
-        root.addHandler(stream_handler)
+            root.addHandler(buffered_handler)
+            self._buffered_handler = buffered_handler
 
         self._root = root
         self._fmt = fmt
-        self._file_handler = None
+        self._file_handler = self._create_file_handler(fmt)
+        if self._file_handler is not None:
+            self._file_handler._casa_owned = True
+            root.addHandler(self._file_handler)
+
+    def _create_file_handler(self, fmt):
+        """
+        Create the buffered file handler: a RotatingFileHandler with
+        delay=True (the file is not opened until the first flush) wrapped in
+        a MemoryHandler so worker threads never block on disk per record.
+        :param fmt: The log format string.
+        :return: The memory handler, or None if the logs folder is unusable.
+        """
+        try:
+            os.makedirs(LOGS_FOLDER, exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                os.path.join(LOGS_FOLDER, LOG_FILE_NAME),
+                maxBytes=2_000_000, backupCount=5, encoding='utf-8', delay=True)
+            file_handler.setFormatter(logging.Formatter(fmt))
+            return logging.handlers.MemoryHandler(
+                capacity=200, flushLevel=logging.ERROR, target=file_handler)
+        except OSError as e:
+            print(f'WARNING: could not set up file logging in {LOGS_FOLDER}: {e}')
+            return None
+
+    def flush(self):
+        """
+        Flush any buffered log records to their targets.
+        :return: None
+        """
+        for handler in self._root.handlers:
+            handler.flush()
 
     def info(self, message: str):
         """
@@ -104,6 +163,14 @@ class Logger:
         """
         logging.error(message)
 
+    def exception(self, message: str):
+        """
+        Log an error message including the active exception's traceback.
+        :param message: The error message to log.
+        :return: None
+        """
+        logging.exception(message)
+
     def delete_logs(self):
         """
         Delete all log files in the logs folder.
@@ -7,6 +7,11 @@
 
 import sys
 import os
+from pathlib import Path
+
+# Evitar el buffering en bloque del stdout en la app empaquetada: sin esto
+# el progreso puede no aparecer hasta que la tarea termina.
+os.environ.setdefault('PYTHONUNBUFFERED', '1')
 
 
 def get_project_root():
@@ -45,21 +50,39 @@ def get_project_root():
 
 
 # --- Definir la raíz del proyecto ---
-PROJECT_ROOT = get_project_root()
+# Se resuelve UNA sola vez con pathlib; las constantes siguen siendo
+# strings para no cambiar la interfaz del módulo.
+_ROOT = Path(get_project_root())
+_DATA = _ROOT / 'data'
+_RAW = _DATA / 'raw'
+_PROCESSED = _DATA / 'procesada'
+
+PROJECT_ROOT = str(_ROOT)
 
 # --- Definir CONSTANTES GLOBALES de rutas ---
 # Todas las rutas ahora son ABSOLUTAS
-DATA_FOLDER = os.path.join(PROJECT_ROOT, 'data')
-RAW_FOLDER = os.path.join(DATA_FOLDER, 'raw')
-PROCESSED_DIR = os.path.join(DATA_FOLDER, 'procesada')
-REPORTS_FOLDER = os.path.join(DATA_FOLDER, 'reportes', 'programa')
+DATA_FOLDER = str(_DATA)
+RAW_FOLDER = str(_RAW)
+PROCESSED_DIR = str(_PROCESSED)
+REPORTS_FOLDER = str(_DATA / 'reportes' / 'programa')
 
 # Archivos específicos
-BASE_FILE = os.path.join(RAW_FOLDER, 'base.xlsx')
-ADMITIDOS_FILE = os.path.join(RAW_FOLDER, 'admitidos.xlsx')
-CONSOLIDATED_FILE = os.path.join(PROCESSED_DIR, 'base_consolidada.xlsx')
-STUDENT_MAP_FILE = os.path.join(PROCESSED_DIR, 'student_program_map.csv')
-
-# Para mostrar en la GUI
-print(f"Raíz del proyecto establecida en: {PROJECT_ROOT}")
-print(f"Carpeta de datos: {DATA_FOLDER}")
\ No newline at end of file
+BASE_FILE = str(_RAW / 'base.xlsx')
+ADMITIDOS_FILE = str(_RAW / 'admitidos.xlsx')
+CONSOLIDATED_FILE = str(_PROCESSED / 'base_consolidada.xlsx')
+CONSOLIDATED_PARQUET = str(_PROCESSED / 'base_consolidada.parquet')
+# Caché proyectada (solo columnas de reporte) que escribe el generador
+# cuando tiene que re-parsear el xlsx; separada para no pisar el
+# consolidado primario de file_merger.
+CONSOLIDATED_PARQUET_CACHE = str(_PROCESSED / 'base_consolidada_cache.parquet')
+STUDENT_MAP_FILE = str(_PROCESSED / 'student_program_map.csv')
+
+
+def describe():
+    """
+    Imprime las rutas principales del proyecto. La GUI lo llama DESPUÉS
+    de instalar el redirector de stdout; importar este módulo no escribe
+    nada en stdout (en la app empaquetada el handle puede estar cerrado).
+    """
+    print(f"Raíz del proyecto establecida en: {PROJECT_ROOT}")
+    print(f"Carpeta de datos: {DATA_FOLDER}")
\ No newline at end of file
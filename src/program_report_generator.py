@@ -16,10 +16,20 @@
 # ================================================ IMPORTS ============================================================
 
 import pandas as pd
+import matplotlib
+# Backend sin GUI: se fija ANTES de importar pyplot para que ni el hilo de
+# trabajo ni los procesos del pool intenten inicializar Tk.
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
-import seaborn as sns
+from matplotlib.collections import PolyCollection
 import numpy as np
+import functools
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pickle import PicklingError
+from typing import NamedTuple
 import logger
 
 try:
@@ -34,6 +44,8 @@ except ImportError:
         'ADMITIDOS_FILE': '../data/raw/admitidos.xlsx',
         'PROCESSED_DIR': '../data/procesada/',
         'CONSOLIDATED_FILE': '../data/procesada/base_consolidada.xlsx',
+        'CONSOLIDATED_PARQUET': '../data/procesada/base_consolidada.parquet',
+        'CONSOLIDATED_PARQUET_CACHE': '../data/procesada/base_consolidada_cache.parquet',
         'STUDENT_MAP_FILE': '../data/procesada/student_program_map.csv'
     })()
 
@@ -41,6 +53,33 @@ except ImportError:
 
 log = logger.Logger()
 
+# Formato de salida de las tablas: 'xlsx' (un libro por programa, para los
+# interesados) o 'parquet' (un archivo por tabla, sin estilos, mucho más
+# rápido de escribir cuando el consumidor es otro proceso y no una persona).
+OUTPUT_FORMAT = 'xlsx'
+
+# Hilo de E/S para las escrituras de los libros: el deflate/zip libera el
+# GIL, así que el libro del programa se serializa mientras se renderizan
+# sus gráficas. El pool se crea perezosamente y POR PROCESO: un executor
+# creado en el padre y heredado por fork llega a los workers con hilos
+# muertos y sus submit() nunca terminan.
+_IO_POOL = None
+_IO_POOL_PID = None
+
+
+def _io_pool() -> ThreadPoolExecutor:
+    """
+    Return the I/O thread pool for the current process, creating it on
+    first use. Keyed on os.getpid() so a forked worker never reuses the
+    parent's executor, whose threads do not survive the fork.
+    :return: The per-process ThreadPoolExecutor.
+    """
+    global _IO_POOL, _IO_POOL_PID
+    if _IO_POOL is None or _IO_POOL_PID != os.getpid():
+        _IO_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix='casa-io')
+        _IO_POOL_PID = os.getpid()
+    return _IO_POOL
+
 
 # ================================================ MAIN GENERATOR =====================================================
 
@@ -49,10 +88,17 @@ def generate_tables_graphs() -> bool:
     Generate a consolidated Excel file by merging base and admitidos files.
     :return: True if the file was generated successfully, False otherwise.
     """
+    # La carga tiene su propio try con excepciones ESPECÍFICAS: un
+    # consolidado ausente o ilegible es un fallo operativo esperado
+    # (mensaje claro, sin traceback); el resto del pipeline reporta lo
+    # inesperado con traceback completo más abajo.
     try:
-        # Load consolidated file
         consolidated_df = load_file()
+    except (FileNotFoundError, OSError, ValueError) as e:
+        log.error(f'Could not load the consolidated file: {e}')
+        return False
 
+    try:
         # Load the student-program map ONCE
         try:
             map_path = paths.STUDENT_MAP_FILE
@@ -63,58 +109,248 @@ def generate_tables_graphs() -> bool:
             log.error("Please run 'file_merger.py' first to generate the map.")
             return False  # Stop execution if map is missing
 
-        # Get unique programs
-        programs = get_programs(consolidated_df)
-
-        # Generate tables and graphs for each program
-        for program in programs:
-            # Create report folder for the program
-            program_folder = create_report_folder(program)
-            # Filter data for the program (convert to DataFrame for consistency)
-            pdf = pd.DataFrame(consolidated_df[consolidated_df['programa'] == program])
-
-            # TODO: Check valid students in the program using the loaded map
-            # pdf = check_students(pdf, student_map_df)
+        # Preprocesar el mapa UNA vez a {programa: frozenset(códigos)}:
+        # así la validación por programa es un lookup + isin contra un
+        # set ya construido, sin re-escanear el CSV completo K veces.
+        try:
+            student_map_df['código del estudiante'] = (
+                student_map_df['código del estudiante'].astype('string'))
+            valid_by_prog = {prog: frozenset(codes) for prog, codes in
+                             student_map_df.groupby('programa', sort=False)['código del estudiante']}
+        except KeyError as e:
+            log.warning(f'Student map is missing expected column {e}; skipping student validation.')
+            valid_by_prog = {}
+
+        # Validar el esquema UNA sola vez: las columnas son idénticas en
+        # todos los programas, así que los faltantes se reportan de
+        # entrada y no como K avisos repetidos por programa.
+        schema = _resolve_columns(consolidated_df)
+        missing = [name for name, col in zip(schema._fields, schema)
+                   if col is None and name not in _OPTIONAL_COLUMNS]
+        if missing:
+            log.warning('Consolidated file is missing expected columns: '
+                        f"{', '.join(missing)}. "
+                        'The affected tables/graphs will fall back per program.')
+
+        # Partition the data once by program instead of re-scanning the whole
+        # frame per program; groupby hands out each slice in a single pass.
+        # load_file guarantees the program column is categorical, so the
+        # split runs on integer codes.
+        prog_col = 'programa' if 'programa' in consolidated_df.columns else 'Programa'
+        grouped = consolidated_df.groupby(prog_col, sort=True, observed=True)
+
+        # Collect the work items first; each program is fully independent
+        # (own folder, own slice), so the loop is embarrassingly parallel.
+        work = []
+        for program, pdf in grouped:
+            # Check valid students in the program using the precomputed map
+            if valid_by_prog:
+                pdf = check_students(pdf, program, valid_by_prog)
 
             # If all students were filtered out, skip this program
             if pdf.empty:
                 log.warning(f"No valid student data for program '{program}' after validation. Skipping.")
                 continue
 
-            # Generate tables and graphs
-            generate_graphs(pdf, program_folder, program)
-            generate_tables(pdf, program_folder, program)
+            # Drop the program column once per slice; the generators below
+            # only read from it, so no defensive copies are needed.
+            work.append((program, pdf.drop(columns=[prog_col])))
+
+        # Dispatch one process per program where it is safe to do so; in the
+        # frozen (PyInstaller) build multiprocessing spawn is unreliable, so
+        # there we run serially, as we do when the pool itself fails.
+        if len(work) > 1 and not getattr(sys, 'frozen', False):
+            try:
+                with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+                    for done in pool.map(_process_program, *zip(*work)):
+                        log.info(f"Report finished for program: {done}")
+                work = []
+            except (BrokenProcessPool, PicklingError, OSError) as e:
+                # Solo fallos del POOL en sí (workers muertos, argumentos no
+                # serializables, sin recursos); un error real dentro de un
+                # programa debe propagarse, no repetir todo en serie.
+                log.warning(f'Parallel report generation unavailable ({e}); running serially.')
+
+        for program, pdf in work:
+            _process_program(program, pdf)
 
         log.info('Tables and graphs generated successfully.')
         return True
     except FileNotFoundError as e:
         log.error(f'Error generating tables and graphs: {e}')
         return False
-    except Exception as e:
-        log.error(f'Unexpected error: {e}')
+    except Exception:
+        # Traceback completo al log: un error de dtype o de escritura
+        # enmascarado como mensaje suelto es imposible de diagnosticar
+        log.exception('Unexpected error generating tables and graphs')
         return False
 
 
 # ================================================ HELPERS ============================================================
 
+def _process_program(program: str, pdf: pd.DataFrame) -> str:
+    """
+    Generate the complete report (graphs and tables) for one program slice.
+    Top-level so it can run either inline or inside a pool worker process.
+    :param program: The program name.
+    :param pdf: The program's slice of the consolidated data.
+    :return: The program name, for progress logging.
+    """
+    program_folder = create_report_folder(program)
+    # Enviar primero la escritura del libro al hilo de E/S; las gráficas
+    # se renderizan mientras el .xlsx se serializa en paralelo.
+    write_future = generate_tables(pdf, program_folder, program)
+    generate_graphs(pdf, program_folder, program)
+    if write_future is not None:
+        write_future.result()  # Propagar errores de escritura
+    return program
+
+
+# Columnas de texto de baja cardinalidad: como 'category' los groupby /
+# unique / isin de las tablas corren sobre códigos enteros en vez de
+# hashear strings, y el frame ocupa una fracción de la memoria.
+_CATEGORICAL_COLS = ('programa', 'competencia', 'objetivo de aprendizaje',
+                     'meta de aprendizaje', 'código y nombre del criterio',
+                     'semestre o ciclo', 'PERIODO')
+
+
+def _pin_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert the known low-cardinality text columns to category dtype and
+    downcast the numeric score columns (mirrors file_merger's
+    downcast_dtypes, for consolidated files written before that change).
+    Idempotent; columns absent from the frame are skipped.
+    :param df: The consolidated DataFrame.
+    :return: The same DataFrame with cheap dtypes pinned.
+    """
+    for col in _CATEGORICAL_COLS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col in df.columns:
+        lc = str(col).strip().lower()
+        try:
+            if lc == 'código del estudiante' and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                # Cada estudiante aparece en muchas filas; como category
+                # los drop_duplicates/isin corren sobre códigos enteros
+                df[col] = df[col].astype('category')
+            elif lc in ('puntaje criterio', 'promedio') and df[col].dtype == np.float64:
+                # float32 basta para puntajes 0-5: mitad de ancho de banda
+                df[col] = df[col].astype('float32')
+        except Exception as e:
+            log.warning(f'Could not downcast column "{col}": {e}')
+    return df
+
+
 def load_file() -> pd.DataFrame:
     """
-    Load the consolidated Excel file into a DataFrame.
+    Load the consolidated file, memoized per process. The cache is keyed
+    on the source files' mtimes, so repeated report runs in one session
+    (e.g. from the GUI) skip even the Parquet read, while regenerating
+    the consolidated file invalidates the cache automatically. Callers
+    must not mutate the returned frame (none of the report code does).
+    :return: A DataFrame containing the consolidated data.
+    """
+    def _mtime(path: str) -> float:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0.0
+
+    return _load_file_cached(_mtime(paths.CONSOLIDATED_PARQUET),
+                             _mtime(paths.CONSOLIDATED_PARQUET_CACHE),
+                             _mtime(paths.CONSOLIDATED_FILE))
+
+
+@functools.lru_cache(maxsize=1)
+def _load_file_cached(pq_mtime: float, cache_mtime: float,
+                      xlsx_mtime: float) -> pd.DataFrame:
+    """
+    Load the consolidated file into a DataFrame, preferring the Parquet copy
+    written by file_merger (much faster than parsing the Excel file), then
+    this module's own projected Parquet cache.
+    :param pq_mtime: mtime of the merger's Parquet (cache key only).
+    :param cache_mtime: mtime of the projected Parquet cache (cache key only).
+    :param xlsx_mtime: mtime of the consolidated xlsx (cache key only).
     :return: A DataFrame containing the consolidated data.
     """
     log.info('Loading consolidated file...')
-    return pd.read_excel(paths.CONSOLIDATED_FILE)
+    pq_path = paths.CONSOLIDATED_PARQUET
+    cache_path = paths.CONSOLIDATED_PARQUET_CACHE
+    xlsx_path = paths.CONSOLIDATED_FILE
+    # Primero el consolidado primario del merger, luego la caché proyectada
+    # propia; cualquiera de los dos se descarta si el xlsx es más reciente
+    # (p. ej. editado a mano por un interesado).
+    for candidate in (pq_path, cache_path):
+        if not os.path.exists(candidate):
+            continue
+        xlsx_is_newer = (os.path.exists(xlsx_path)
+                         and os.path.getmtime(xlsx_path) > os.path.getmtime(candidate))
+        if not xlsx_is_newer:
+            try:
+                try:
+                    # Memory-mapped read: the OS page cache backs the column
+                    # buffers and to_pandas hands them over without copying.
+                    import pyarrow.parquet as pq
+                    tbl = pq.read_table(candidate, memory_map=True)
+                    df = tbl.to_pandas(self_destruct=True, split_blocks=True)
+                except ImportError:
+                    df = pd.read_parquet(candidate)
+                # Caches written before the dtype pinning may still carry
+                # object columns; normalize here so callers can rely on it.
+                return _pin_categories(df)
+            except Exception as e:
+                log.warning(f'Could not read consolidated Parquet, falling back to Excel: {e}')
+    # Leer solo las columnas que las tablas y gráficas consumen: el parser
+    # de xlsx paga por celda, y el consolidado puede arrastrar columnas
+    # que ningún reporte usa. Primero los encabezados (nrows=0, barato),
+    # luego la lectura real restringida a ese subconjunto.
+    usecols = None
+    try:
+        header = pd.read_excel(xlsx_path, nrows=0)
+        cmap = _resolve_columns(header)
+        needed = set(filter(None, cmap))
+        needed.update(c for c in ('programa', 'Programa') if c in header.columns)
+        if needed and len(needed) < len(header.columns):
+            usecols = sorted(needed)
+    except Exception as e:
+        log.warning(f'Could not pre-resolve columns for the Excel read: {e}')
+    try:
+        # calamine parses the xlsx in Rust, several times faster than the
+        # default openpyxl path; fall back if the package is missing.
+        df = pd.read_excel(xlsx_path, engine='calamine', usecols=usecols)
+    except (ImportError, ValueError):
+        df = pd.read_excel(xlsx_path, usecols=usecols)
+    # Pin cheap-to-group dtypes before caching so every later run gets the
+    # category codes for free from the Parquet file. The projected cache
+    # goes to its own file: overwriting the merger's Parquet would replace
+    # the primary artifact with this usecols-trimmed copy.
+    df = _pin_categories(df)
+    try:
+        df.to_parquet(cache_path)
+        log.info(f'Consolidated data cached to {cache_path}')
+    except Exception as e:
+        log.warning(f'Could not cache consolidated data to Parquet: {e}')
+    return df
 
 
-def get_programs(df: pd.DataFrame) -> list:
+def fast_agg(grouped, func, parallel: bool = True):
     """
-    Get the unique programs from the DataFrame.
-    :param df: DataFrame containing the consolidated data.
-    :return: A list of unique programs.
+    Aggregate a GroupBy with pandas' numba engine when available. Custom
+    aggregations written as plain Python lambdas run group-by-group in the
+    interpreter; numba compiles them to native loops instead. The function
+    must take (values, index) and return a scalar. numba is an OPTIONAL
+    dependency: without it (or for functions it cannot compile) this falls
+    back to the regular engine.
+    :param grouped: A pandas GroupBy object.
+    :param func: The aggregation function, (values, index) -> scalar.
+    :param parallel: Whether numba may parallelize across groups.
+    :return: The aggregated result.
     """
-    log.info('Getting unique programs...')
-    prog_col = 'programa' if 'programa' in df.columns else 'Programa'
-    return sorted(df[prog_col].dropna().unique().tolist())
+    try:
+        return grouped.agg(func, engine='numba',
+                           engine_kwargs={'parallel': parallel, 'nogil': True})
+    except (ImportError, TypeError, NotImplementedError):
+        return grouped.agg(func)
 
 
 def create_report_folder(program: str) -> str:
@@ -124,18 +360,20 @@ def create_report_folder(program: str) -> str:
     :return: The path to the program's report folder.
     """
     folder = os.path.join(paths.REPORTS_FOLDER, program)
-    if not os.path.exists(folder):
-        log.info(f'Creating report folder: {folder}')
-        os.makedirs(folder, exist_ok=True)
+    # makedirs con exist_ok es idempotente; el probe con os.path.exists
+    # solo añadía un stat() extra por programa
+    os.makedirs(folder, exist_ok=True)
     return folder
 
 
-def check_students(pdf: pd.DataFrame, student_map: pd.DataFrame) -> pd.DataFrame:
+def check_students(pdf: pd.DataFrame, program: str, valid_by_prog: dict) -> pd.DataFrame:
     """
     Filters the program DataFrame to include only students who are
-    officially admitted to that program, using the pre-loaded student map.
+    officially admitted to that program, using the precomputed
+    {programa: frozenset(códigos)} map built from 'student_program_map.csv'.
     :param pdf: The DataFrame for a single program.
-    :param student_map: The DataFrame from 'student_program_map.csv'.
+    :param program: The program name (the groupby key).
+    :param valid_by_prog: Mapping of program -> frozenset of student codes.
     :return: A filtered DataFrame.
     """
     if pdf.empty:
@@ -143,308 +381,536 @@ def check_students(pdf: pd.DataFrame, student_map: pd.DataFrame) -> pd.DataFrame
         return pdf
 
     try:
-        # Get the target program from the already-filtered DataFrame
-        target_program = pdf['programa'].iloc[0]
-
-        # Get the list of all student codes *officially* in this program
-        # Ensure 'código del estudiante' is string for comparison
-        student_map_clean = student_map.copy()
-        student_map_clean['código del estudiante'] = student_map_clean['código del estudiante'].astype(str)
-
-        valid_students = student_map_clean[
-            student_map_clean['programa'] == target_program
-            ]['código del estudiante']
-
-        # Ensure the DataFrame's student code is also a string for comparison
-        pdf_clean = pdf.copy()
-        pdf_clean['código del estudiante'] = pdf_clean['código del estudiante'].astype(str)
-
-        # Filter the DataFrame to only include students in the valid list
-        original_count = len(pdf_clean)
-        valid_pdf = pdf_clean[
-            pdf_clean['código del estudiante'].isin(valid_students)
-        ]
+        valid_students = valid_by_prog.get(program)
+        if valid_students is None:
+            log.warning(f"Program '{program}' not found in the student map; keeping all records.")
+            return pdf
+
+        # Compute the mask on a cast view; no defensive copies needed as
+        # the table/graph functions never mutate their input frame.
+        mask = pdf['código del estudiante'].astype('string').isin(valid_students)
+
+        original_count = len(pdf)
+        valid_pdf = pdf[mask]
         final_count = len(valid_pdf)
 
         if original_count != final_count:
             dropped_count = original_count - final_count
-            log.warning(f"Program '{target_program}': "
+            log.warning(f"Program '{program}': "
                         f"Removed {dropped_count} records for students "
                         f"not found in the program map.")
         else:
-            log.info(f"Program '{target_program}': "
+            log.info(f"Program '{program}': "
                      f"All {original_count} records validated against program map.")
 
         return valid_pdf
 
     except Exception as e:
-        log.error(f"Error during student validation for program '{target_program}': {e}")
+        log.error(f"Error during student validation for program '{program}': {e}")
         return pdf  # Return original df on unexpected error
 
 
 # ================================================ TABLE GENERATION ===================================================
 
-def generate_tables(pdf: pd.DataFrame, folder_path: str, program: str):
+def _excel_writer(path: str) -> pd.ExcelWriter:
     """
-    Generate all tables for a given program.
-    :param pdf: DataFrame filtered by program.
+    Open an ExcelWriter for the program workbook, preferring the faster
+    xlsxwriter engine and falling back to pandas' default if unavailable.
+    constant_memory is deliberately not enabled: pandas writes sheets
+    column by column, and constant_memory silently drops writes to rows
+    it has already flushed, which would empty every data column.
+    :param path: Destination .xlsx path.
+    :return: An ExcelWriter usable as a context manager.
+    """
+    try:
+        return pd.ExcelWriter(path, engine='xlsxwriter')
+    except (ImportError, ValueError, TypeError):
+        return pd.ExcelWriter(path)
+
+
+class ColumnMap(NamedTuple):
+    """
+    Resolved column names for one program's frame; every field is the
+    actual column name, or None when the column is absent.
+    """
+    periodo: str = None
+    cohorte: str = None
+    cohorte_o_periodo: str = None
+    competencia: str = None
+    meta: str = None
+    objetivo: str = None
+    criterio: str = None
+    puntaje: str = None
+    promedio: str = None
+    estudiante: str = None
+
+
+# Fields whose absence is normal and does not degrade any table/graph:
+# 'promedio' is an optional alternative score column, table_6 falls back
+# to 'puntaje criterio' by design. Excluded from the schema warning.
+_OPTIONAL_COLUMNS = frozenset({'promedio'})
+
+
+def _resolve_columns(df: pd.DataFrame) -> ColumnMap:
+    """
+    Resolve the column names shared by the table and graph functions ONCE
+    per program, instead of every function re-scanning df.columns with
+    the same substring searches. Each consumer keeps its own fallback for
+    absent (None) columns.
+    :param df: DataFrame filtered by program.
+    :return: A ColumnMap of logical name -> actual column name (or None).
+    """
+    cols = list(df.columns)
+    low = {c: c.lower() for c in cols}
+
+    # Periodo de aplicación (semestre) vs cohorte de ingreso (PERIODO)
+    per_col = next((c for c in cols if c.strip().lower().startswith('semestre')
+                    or 'semestre o ciclo' in low[c] or low[c].startswith('periodo')), None)
+    coh_col = next((c for c in cols if c.strip().upper() == 'PERIODO' or 'cohorte' in low[c]), None)
+    coh_per_col = next((c for c in cols if c.strip().upper() in {'PERIODO', 'COHORTE'}
+                        or 'cohorte' in low[c] or low[c].startswith('periodo')), None)
+    if coh_per_col is None:
+        coh_per_col = next((c for c in cols if 'semestre o ciclo' in low[c]
+                            or c.strip().lower().startswith('semestre')), None)
+
+    # Criterio: preferir el nombre completo con código
+    crit_col = next((c for c in cols if 'código y nombre del criterio' in low[c]
+                     or 'codigo y nombre del criterio' in low[c]), None)
+    if crit_col is None:
+        crit_col = next((c for c in cols if 'nombre del criterio' in low[c]), None)
+    if crit_col is None:
+        crit_col = next((c for c in cols if 'criterio' in low[c] and 'puntaje' not in low[c]), None)
+
+    return ColumnMap(
+        periodo=per_col,
+        cohorte=coh_col,
+        cohorte_o_periodo=coh_per_col,
+        competencia=next((c for c in cols if 'competencia' in low[c]), None),
+        meta=next((c for c in cols if 'meta de aprendizaje' in low[c]), None),
+        objetivo=next((c for c in cols if 'objetivo de aprendizaje' in low[c]), None),
+        criterio=crit_col,
+        puntaje=next((c for c in cols if 'puntaje criterio' in low[c]), None),
+        promedio=next((c for c in cols if c.strip().upper() == 'PROMEDIO'
+                       or 'promedio escritura' in low[c]), None),
+        estudiante=next((c for c in cols if 'código del estudiante' in low[c]
+                         or low[c] == 'codigo'), None),
+    )
+
+
+def _shared_aggregates(df: pd.DataFrame, resolved: ColumnMap) -> dict:
+    """
+    Precompute the groupby aggregates shared by several tables. Tables 2,
+    4, 5, 7, 8 and 9 each used to re-group the same period/objetivo/
+    criterio/competencia keys, rebuilding the same hash tables six times
+    per program; here each distinct grouping is hashed exactly once and
+    the tables just unstack/round the cached result.
+    :param df: DataFrame filtered by program.
+    :param resolved: ColumnMap from _resolve_columns.
+    :return: Mapping of aggregate name -> Series/DataFrame (keys absent
+             when their columns are missing or the aggregation failed).
+    """
+    per_col = resolved.periodo
+    obj_col = resolved.objetivo
+    crit_col = resolved.criterio
+    comp_col = resolved.competencia
+    coh_col = resolved.cohorte
+    coh_per_col = resolved.cohorte_o_periodo
+    score_col = resolved.puntaje
+
+    aggs = {}
+    try:
+        if per_col and obj_col:
+            aggs['count_per_obj'] = df.groupby([per_col, obj_col], observed=True).size()
+        if per_col and comp_col and score_col:
+            aggs['mean_per_comp'] = df.groupby([per_col, comp_col], observed=True)[score_col].mean()
+        if per_col and obj_col and crit_col and score_col:
+            tmp = df[[obj_col, crit_col, per_col, score_col]].dropna()
+            aggs['mean_obj_crit_per'] = tmp.groupby([obj_col, crit_col, per_col],
+                                                    observed=True)[score_col].mean()
+        if coh_col and comp_col and score_col:
+            aggs['mean_coh_comp'] = df.groupby([coh_col, comp_col], observed=True)[score_col].mean()
+        if coh_per_col and obj_col and score_col:
+            tmp = df[[coh_per_col, obj_col, score_col]].dropna()
+            aggs['stats_coh_obj'] = tmp.groupby([coh_per_col, obj_col],
+                                                observed=True)[score_col].agg(['mean', 'std'])
+    except Exception as e:
+        # Las tablas recalculan por su cuenta lo que falte aquí
+        log.warning(f'Could not precompute shared aggregates: {e}')
+    return aggs
+
+
+def generate_tables(df: pd.DataFrame, folder_path: str, program: str):
+    """
+    Generate all tables for a given program. Each table function only
+    COMPUTES its table; the writing happens in _write_tables on the I/O
+    pool so the caller can keep rendering graphs in the meantime.
+    :param df: DataFrame filtered by program (without the program column).
     :param folder_path: Path to save the tables.
     :param program: The program name.
-    :return: None
+    :return: A Future for the pending write, or None if nothing to write.
     """
-    df = pdf.drop(columns=['programa']).copy()
+    if df.empty:
+        log.warning(f'No data to tabulate for program: {program}. Skipping tables.')
+        return None
     log.info(f'Generating tables for program: {program}')
-    table_1(df, folder_path, program)
-    table_2(df, folder_path, program)
-    table_3(df, folder_path, program)
-    table_4(df, folder_path, program)
-    table_5(df, folder_path, program)
-    table_6(df, folder_path, program)
-    table_7(df, folder_path, program)
-    table_8(df, folder_path, program)
-    table_9(df, folder_path, program)
+    resolved = _resolve_columns(df)
+    aggs = _shared_aggregates(df, resolved)
+    builders = (table_1, table_2, table_3, table_4, table_5,
+                table_6, table_7, table_8, table_9)
+    items = [item for item in (build(df, resolved, aggs, program) for build in builders)
+             if item is not None]
+    if not items:
+        log.warning(f'No tables produced for program: {program}')
+        return None
 
+    return _io_pool().submit(_write_tables, folder_path, program, items)
 
-def table_1(df: pd.DataFrame, folder_path: str, program: str):
+
+def _write_tables(folder_path: str, program: str, items: list):
     """
-    Tabla 1: Descripción de competencias, metas y objetivos de aprendizaje.
-    :param df: DataFrame filtered by program.
+    Write the computed tables: as sheets of one workbook (xlsx, the
+    stakeholder deliverable) or as one parquet file per table when
+    OUTPUT_FORMAT = 'parquet'.
     :param folder_path: Path to save the tables.
     :param program: The program name.
+    :param items: (sheet_name, table, to_excel kwargs) tuples.
     :return: None
     """
+    # Los fallbacks (muestras de filas por columnas faltantes) van a CSV:
+    # el libro solo lleva tablas reales y el camino de error no paga el
+    # pipeline xlsx completo.
+    fallbacks = [(name, table) for name, table, kwargs in items
+                 if kwargs.get('csv_fallback')]
+    items = [item for item in items if not item[2].get('csv_fallback')]
+    for sheet_name, table in fallbacks:
+        _fallback_dump(table, folder_path, program, sheet_name)
+
+    if OUTPUT_FORMAT == 'parquet':
+        for sheet_name, table, kwargs in items:
+            # Preferir el frame numérico pre-formato si la tabla lo aporta
+            # (Tabla 2 sustituye ceros por '—', inconvertible a parquet);
+            # Styler -> DataFrame subyacente, parquet no lleva estilos
+            data = kwargs.get('parquet_frame', table)
+            data = getattr(data, 'data', data)
+            # parquet exige nombres de columna string: aplanar MultiIndex
+            # (μ/σ de la Tabla 9) y forzar str en índices object mixtos
+            # (la fila 'Promedio' junto a cohortes numéricas)
+            data = data.copy(deep=False)
+            if isinstance(data.columns, pd.MultiIndex):
+                data.columns = [' '.join(str(part) for part in tup).strip()
+                                for tup in data.columns]
+            else:
+                data.columns = data.columns.map(str)
+            if not isinstance(data.index, pd.MultiIndex) and data.index.dtype == object:
+                data.index = data.index.map(str)
+            name = sheet_name.replace(' ', '_').lower()
+            data.to_parquet(os.path.join(folder_path, f'{program}_{name}.parquet'))
+    elif items:
+        out_path = os.path.join(folder_path, f'{program}_tablas.xlsx')
+        with _excel_writer(out_path) as xw:
+            for sheet_name, table, kwargs in items:
+                # Cada hoja con su propio try: un fallo en una tabla no debe
+                # tumbar el libro completo (el .result() del futuro lo
+                # propagaría y abortaría el programa entero).
+                try:
+                    kwargs.pop('parquet_frame', None)
+                    if kwargs.pop('heatmap', False) and getattr(xw, 'engine', '') == 'xlsxwriter':
+                        _write_heatmap_sheet(xw, sheet_name, table)
+                        continue
+                    if kwargs.pop('styler_heatmap', False):
+                        # Motor sin Formats nativos: volver al Styler de pandas
+                        table = table.style.format(precision=2).background_gradient(
+                            cmap='RdYlGn', axis=None)
+                    table.to_excel(xw, sheet_name=sheet_name, **kwargs)
+                except Exception as e:
+                    log.error(f'Could not write sheet {sheet_name} for {program}: {e}')
+
+
+def _fallback_dump(table: pd.DataFrame, folder_path: str, program: str, sheet_name: str):
+    """
+    Write a table's fallback row sample as a small CSV next to the
+    workbook. Going through the Excel writer here put the slow xlsx
+    pipeline on the error path too; to_csv is near-free and keeps the
+    stakeholder workbook free of half-built sheets.
+    :param table: The sample rows to dump (already trimmed by the caller).
+    :param folder_path: Path to save the dump.
+    :param program: The program name.
+    :param sheet_name: Sheet name the table would have used (e.g. 'Tabla 3').
+    :return: None
+    """
+    name = sheet_name.replace(' ', '_').lower()
+    out_path = os.path.join(folder_path, f'{program}_{name}_fallback.csv')
     try:
-        cols = df.columns
-        comp_col = next((c for c in cols if 'competencia' in c.lower()), None)
-        meta_col = next((c for c in cols if 'meta de aprendizaje' in c.lower()), None)
-        obj_col = next((c for c in cols if 'objetivo de aprendizaje' in c.lower()), None)
+        table.to_csv(out_path, index=False)
+        log.warning(f'Fallback sample for {sheet_name} written to {out_path}')
+    except Exception as e:
+        log.error(f'Could not write fallback CSV for {sheet_name}: {e}')
+
+
+def _write_heatmap_sheet(xw, sheet_name: str, pv: pd.DataFrame):
+    """
+    Write a mean-score pivot as a heatmap sheet using xlsxwriter Formats
+    directly. The Styler path materializes per-cell CSS in Python and
+    re-parses it on write; here the RdYlGn gradient is binned into 32
+    precomputed Formats and each cell costs one lookup + write_number.
+    :param xw: An open pandas ExcelWriter on the xlsxwriter engine.
+    :param sheet_name: Name of the sheet to create.
+    :param pv: Numeric pivot (index may be a MultiIndex).
+    :return: None
+    """
+    ws = xw.book.add_worksheet(sheet_name)
+    arr = pv.to_numpy(dtype=float)
+
+    # Pivote sin celdas: nanmin/nanmax lanzan ValueError sobre un array
+    # vacío; dejar solo la hoja con el encabezado
+    if arr.size == 0:
+        nlev = pv.index.nlevels
+        for lvl in range(nlev):
+            ws.write(0, lvl, str(pv.index.names[lvl] or ''))
+        for j, col in enumerate(pv.columns):
+            ws.write(0, nlev + j, str(col))
+        return
+
+    # Normalizar a [0, 1] y asignar cada celda a uno de 32 bins de color.
+    # Solo sobre las celdas válidas: castear NaN a int emite un
+    # RuntimeWarning (que la GUI muestra como ERROR al redirigir stderr)
+    # y sobre un pivote todo-NaN nanmin/nanmax avisan de "All-NaN slice".
+    valid = ~np.isnan(arr)
+    bins = np.zeros(arr.shape, dtype=int)
+    if valid.any():
+        vmin = arr[valid].min()
+        vmax = arr[valid].max()
+        span = (vmax - vmin) or 1.0
+        bins[valid] = np.clip(((arr[valid] - vmin) / span * 32).astype(int), 0, 31)
+    colors = (plt.get_cmap('RdYlGn')(np.linspace(0, 1, 32))[:, :3] * 255).astype(int)
+    fmts = [xw.book.add_format({'bg_color': '#%02x%02x%02x' % tuple(rgb),
+                                'num_format': '0.00'})
+            for rgb in colors]
+
+    # Encabezado: niveles del índice y luego las columnas de periodo
+    nlev = pv.index.nlevels
+    for lvl in range(nlev):
+        ws.write(0, lvl, str(pv.index.names[lvl] or ''))
+    for j, col in enumerate(pv.columns):
+        ws.write(0, nlev + j, str(col))
+
+    for i in range(arr.shape[0]):
+        idx = pv.index[i]
+        for lvl, value in enumerate(idx if isinstance(idx, tuple) else (idx,)):
+            ws.write(i + 1, lvl, str(value))
+        for j in range(arr.shape[1]):
+            if valid[i, j]:
+                ws.write_number(i + 1, nlev + j, float(arr[i, j]), fmts[bins[i, j]])
+
+
+def table_1(df: pd.DataFrame, resolved: ColumnMap, aggs: dict, program: str):
+    """
+    Tabla 1: Descripción de competencias, metas y objetivos de aprendizaje.
+    :param df: DataFrame filtered by program.
+    :param resolved: ColumnMap from _resolve_columns.
+    :param program: The program name.
+    :return: A (sheet_name, table, to_excel kwargs) tuple, or None on error.
+    """
+    try:
+        comp_col = resolved.competencia
+        meta_col = resolved.meta
+        obj_col = resolved.objetivo
         if comp_col is None or meta_col is None or obj_col is None:
-            out_path = os.path.join(folder_path, f'{program}_tabla_1.xlsx')
-            with pd.ExcelWriter(out_path) as xw:
-                df.head(50).to_excel(xw, index=False, sheet_name='Datos')
             log.warning(f'Table 1 fallback written (column not found) for program: {program}')
-            return
+            return 'Tabla 1', df.head(50), {'csv_fallback': True}
 
         tmp = df[[comp_col, meta_col, obj_col]].dropna().drop_duplicates()
-        metas = (tmp.groupby(comp_col)[meta_col]
-                 .apply(lambda s: "".join(sorted(map(str, pd.unique(s)))))
-                 .rename('Metas de aprendizaje'))
-        objetivos = (tmp.groupby(comp_col)[obj_col]
-                     .apply(lambda s: "".join(sorted(map(str, pd.unique(s)))))
-                     .rename('Objetivos de aprendizaje'))
+        # Deduplicar y ordenar ANTES de agrupar: así la concatenación por
+        # grupo es el agregado integrado ''.join, sin lambda de Python ni
+        # pd.unique por grupo.
+        pairs_meta = (tmp[[comp_col, meta_col]].drop_duplicates()
+                      .astype({meta_col: str})
+                      .sort_values([comp_col, meta_col]))
+        metas = (pairs_meta.groupby(comp_col, observed=True, sort=False)[meta_col]
+                 .agg(''.join).rename('Metas de aprendizaje'))
+        pairs_obj = (tmp[[comp_col, obj_col]].drop_duplicates()
+                     .astype({obj_col: str})
+                     .sort_values([comp_col, obj_col]))
+        objetivos = (pairs_obj.groupby(comp_col, observed=True, sort=False)[obj_col]
+                     .agg(''.join).rename('Objetivos de aprendizaje'))
         out = pd.concat([metas, objetivos], axis=1).reset_index()
         out.columns = ['Competencia', 'Metas de aprendizaje', 'Objetivos de aprendizaje']
 
-        out_path = os.path.join(folder_path, f'{program}_tabla_1.xlsx')
-        with pd.ExcelWriter(out_path) as xw:
-            out.to_excel(xw, index=False, sheet_name='Tabla 1')
         log.info(f'Table 1 generated for program: {program}')
+        return 'Tabla 1', out, {'index': False}
     except Exception as e:
         log.error(f'Error in Table 1: {e}')
 
 
-def table_2(df: pd.DataFrame, folder_path: str, program: str):
+def table_2(df: pd.DataFrame, resolved: ColumnMap, aggs: dict, program: str):
     """
     Tabla 2: Cantidad de mediciones por Objetivo de aprendizaje y Periodo.
     :param df: DataFrame filtered by program.
-    :param folder_path: Path to save the tables.
+    :param resolved: ColumnMap from _resolve_columns.
+    :param aggs: Shared aggregates from _shared_aggregates.
     :param program: The program name.
-    :return: None
+    :return: A (sheet_name, table, to_excel kwargs) tuple, or None on error.
     """
     try:
-        cols = df.columns
-        per_col = next((c for c in cols if c.strip().lower().startswith(
-            'semestre') or 'semestre o ciclo' in c.lower() or c.lower().startswith('periodo')), None)
-        obj_col = next((c for c in cols if 'objetivo de aprendizaje' in c.lower()), None)
+        per_col = resolved.periodo
+        obj_col = resolved.objetivo
         if per_col is None or obj_col is None:
-            out_path = os.path.join(folder_path, f'{program}_tabla_2.xlsx')
-            with pd.ExcelWriter(out_path) as xw:
-                df.head(50).to_excel(xw, index=False, sheet_name='Datos')
             log.warning(f'Table 2 fallback written (column not found) for program: {program}')
-            return
-        pv = (df.groupby([per_col, obj_col]).size().unstack(fill_value=0).sort_index())
+            return 'Tabla 2', df.head(50), {'csv_fallback': True}
+        counts = aggs.get('count_per_obj')
+        if counts is not None:
+            pv = counts.unstack(fill_value=0).sort_index()
+        else:
+            # Sin el agregado compartido, crosstab hace el groupby y el
+            # pivot con ceros en una sola llamada
+            pv = pd.crosstab(df[per_col], df[obj_col]).sort_index()
         pv['# Total'] = pv.sum(axis=1)
         total_row = pv.sum(axis=0).to_frame().T
         total_row.index = ['Total']
         out_df = pd.concat([pv, total_row], axis=0)
-        formatted = out_df.astype(object)
-        for c in formatted.columns:
-            formatted[c] = formatted[c].apply(lambda x: '—' if (pd.notnull(x) and x == 0) else x)
-        out_path = os.path.join(folder_path, f'{program}_tabla_2.xlsx')
-        with pd.ExcelWriter(out_path) as xw:
-            formatted.to_excel(xw, sheet_name='Tabla 2')
+        # Sustitución vectorizada de ceros por '—': una sola pasada sobre
+        # el ndarray en vez de un callback de Python por celda.
+        out_arr = out_df.to_numpy(dtype=object, copy=True)
+        out_arr[out_arr == 0] = '—'
+        formatted = pd.DataFrame(out_arr, index=out_df.index, columns=out_df.columns)
         log.info(f'Table 2 generated for program: {program}')
+        # El frame numérico pre-guiones viaja aparte: las celdas object
+        # que mezclan enteros y '—' no son convertibles a parquet
+        return 'Tabla 2', formatted, {'parquet_frame': out_df}
     except Exception as e:
         log.error(f'Error in Table 2: {e}')
 
 
-def table_3(df: pd.DataFrame, folder_path: str, program: str):
+def table_3(df: pd.DataFrame, resolved: ColumnMap, aggs: dict, program: str):
     """
     Tabla 3: Descripción de criterios por Objetivo de aprendizaje.
     :param df: DataFrame filtered by program.
-    :param folder_path: Path to save the tables.
+    :param resolved: ColumnMap from _resolve_columns.
     :param program: The program name.
-    :return: None
+    :return: A (sheet_name, table, to_excel kwargs) tuple, or None on error.
     """
     try:
-        cols = list(df.columns)
-        obj_candidates = [c for c in cols if 'objetivo de aprendizaje' in c.lower()]
-        crit_candidates = [c for c in cols if ('código y nombre del criterio' in c.lower()) or (
-                'codigo y nombre del criterio' in c.lower()) or ('nombre del criterio' in c.lower()) or (
-                                   'criterio' in c.lower())]
-        obj_col = obj_candidates[0] if obj_candidates else None
-        criterio_col = None
-        for c in crit_candidates:
-            if 'código y nombre del criterio' in c.lower() or 'codigo y nombre del criterio' in c.lower():
-                criterio_col = c;
-                break
-        if criterio_col is None and crit_candidates:
-            criterio_col = crit_candidates[0]
+        obj_col = resolved.objetivo
+        criterio_col = resolved.criterio
 
         if obj_col is None or criterio_col is None:
-            out_path = os.path.join(folder_path, f'{program}_tabla_3.xlsx')
-            with pd.ExcelWriter(out_path) as xw:
-                df.head(50).to_excel(xw, index=False, sheet_name='Datos')
             log.warning(
                 f'Table 3 fallback written (column not found) for program: {program} | obj_col={obj_col} criterio_col={criterio_col}')
-            return
+            return 'Tabla 3', df.head(50), {'csv_fallback': True}
 
-        # Mantener combinaciones únicas objetivo-criterio (para no duplicar criterios)
+        # Combinaciones únicas objetivo-criterio, ya ordenadas; tras el
+        # drop_duplicates el conteo por objetivo es transform('size')
+        # (== nunique) en una sola pasada, sin el groupby+map de antes.
         base = (df[[obj_col, criterio_col]]
                 .dropna()
+                .astype('string')
                 .drop_duplicates()
-                .astype({obj_col: str, criterio_col: str}))
-
-        # Conteo de criterios por objetivo
-        counts = base.groupby(obj_col)[criterio_col].nunique().rename('__n')
-
-        # Expandir a "un criterio por fila"
-        long_df = base.copy()
-        long_df['__n'] = long_df[obj_col].map(counts)
-
-        # Orden opcional por objetivo y nombre de criterio
-        long_df = long_df.sort_values([obj_col, criterio_col]).reset_index(drop=True)
-
-        out_df = long_df.rename(columns={obj_col: 'Objetivos de aprendizaje', criterio_col: 'Nombre del criterio',
-                                         '__n': 'Número de criterios'})[
-            ['Objetivos de aprendizaje', 'Número de criterios', 'Nombre del criterio']
-        ]
-
-        # Dejar valores solo en la primera fila de cada objetivo; poner nulos en las siguientes
-        dup_mask = out_df['Objetivos de aprendizaje'].duplicated(keep='first')
-        out_df.loc[dup_mask, ['Objetivos de aprendizaje', 'Número de criterios']] = pd.NA
-
-        # Fila total (suma de únicos por objetivo)
-        total_criterios = int(counts.sum())
+                .sort_values([obj_col, criterio_col], ignore_index=True))
+        counts = base.groupby(obj_col, observed=True, sort=False)[criterio_col].transform('size')
+
+        # Dejar valores solo en la primera fila de cada objetivo: asignación
+        # booleana directa sobre los ndarrays, sin .loc fila a fila
+        dup_mask = base[obj_col].duplicated().to_numpy()
+        arr_obj = base[obj_col].to_numpy(copy=True)
+        arr_obj[dup_mask] = None
+        arr_n = counts.to_numpy(dtype=object, copy=True)
+        arr_n[dup_mask] = None
+
+        out_df = pd.DataFrame({
+            'Objetivos de aprendizaje': arr_obj,
+            'Número de criterios': arr_n,
+            'Nombre del criterio': base[criterio_col].to_numpy(),
+        })
+
+        # Fila total: sobre pares deduplicados, la suma de únicos por
+        # objetivo es simplemente el número de filas
+        total_criterios = len(base)
         total_row = pd.DataFrame([
             {'Objetivos de aprendizaje': 'Total criterios', 'Número de criterios': total_criterios,
              'Nombre del criterio': ''}
         ])
         out_df = pd.concat([out_df, total_row], ignore_index=True)
 
-        out_path = os.path.join(folder_path, f'{program}_tabla_3.xlsx')
-        with pd.ExcelWriter(out_path) as xw:
-            out_df.to_excel(xw, index=False, sheet_name='Tabla 3')
         log.info(f'Table 3 generated for program: {program}')
+        return 'Tabla 3', out_df, {'index': False}
     except Exception as e:
         log.error(f'Error in Table 3: {e}')
 
 
-def table_4(df: pd.DataFrame, folder_path: str, program: str):
+def table_4(df: pd.DataFrame, resolved: ColumnMap, aggs: dict, program: str):
     """
     Tabla 4: Promedio por Competencia y Periodo.
     :param df: DataFrame filtered by program.
-    :param folder_path: Path to save the tables.
+    :param resolved: ColumnMap from _resolve_columns.
+    :param aggs: Shared aggregates from _shared_aggregates.
     :param program: The program name.
-    :return: None
+    :return: A (sheet_name, table, to_excel kwargs) tuple, or None on error.
     """
     try:
-        cols = df.columns
-        per_col = next((c for c in cols if c.strip().lower().startswith(
-            'semestre') or 'semestre o ciclo' in c.lower() or c.lower().startswith('periodo')), None)
-        comp_col = next((c for c in cols if 'competencia' in c.lower()), None)
-        score_col = next((c for c in cols if 'puntaje criterio' in c.lower()), None)
+        per_col = resolved.periodo
+        comp_col = resolved.competencia
+        score_col = resolved.puntaje
         if per_col is None or comp_col is None or score_col is None:
-            out_path = os.path.join(folder_path, f'{program}_tabla_4.xlsx')
-            with pd.ExcelWriter(out_path, engine='xlsxwriter') as xw:
-                df.head(50).to_excel(xw, index=False, sheet_name='Datos')
             log.warning(f'Table 4 fallback written (column not found) for program: {program}')
-            return
-        pv = (df.groupby([per_col, comp_col])[score_col]
-              .mean().unstack())
+            return 'Tabla 4', df.head(50), {'csv_fallback': True}
+        means = aggs.get('mean_per_comp')
+        if means is None:
+            means = df.groupby([per_col, comp_col], observed=True)[score_col].mean()
         # Redondeo 2 decimales
-        pv = pv.round(2)
-        out_path = os.path.join(folder_path, f'{program}_tabla_4.xlsx')
-        pv.to_excel(out_path)
+        pv = means.unstack().round(2)
         log.info(f'Table 4 generated for program: {program}')
+        return 'Tabla 4', pv, {}
     except Exception as e:
         log.error(f'Error in Table 4: {e}')
 
 
-def table_5(df: pd.DataFrame, folder_path: str, program: str):
+def table_5(df: pd.DataFrame, resolved: ColumnMap, aggs: dict, program: str):
     """
     Tabla 5: Promedio por Criterio dentro de Objetivo y Periodo.
     :param df: DataFrame filtered by program.
-    :param folder_path: Path to save the tables.
+    :param resolved: ColumnMap from _resolve_columns.
+    :param aggs: Shared aggregates from _shared_aggregates.
     :param program: The program name.
-    :return: None
+    :return: A (sheet_name, table, to_excel kwargs) tuple, or None on error.
     """
     try:
-        cols = df.columns
-        per_col = next((c for c in cols if c.strip().lower().startswith(
-            'semestre') or 'semestre o ciclo' in c.lower() or c.lower().startswith('periodo')), None)
-        obj_col = next((c for c in cols if 'objetivo de aprendizaje' in c.lower()), None)
-        crit_col = next(
-            (c for c in cols if 'código y nombre del criterio' in c.lower() or 'nombre del criterio' in c.lower()),
-            None)
-        score_col = next((c for c in cols if 'puntaje criterio' in c.lower()), None)
+        per_col = resolved.periodo
+        obj_col = resolved.objetivo
+        crit_col = resolved.criterio
+        score_col = resolved.puntaje
         if per_col is None or obj_col is None or crit_col is None or score_col is None:
-            out_path = os.path.join(folder_path, f'{program}_tabla_5.xlsx')
-            with pd.ExcelWriter(out_path) as xw:
-                df.head(50).to_excel(xw, index=False, sheet_name='Datos')
             log.warning(f'Table 5 fallback written (column not found) for program: {program}')
-            return
-        tmp = df[[per_col, obj_col, crit_col, score_col]].dropna()
-        pv = (tmp.groupby([obj_col, crit_col, per_col])[score_col]
-              .mean().round(2).unstack(fill_value=np.nan))
-        out_path = os.path.join(folder_path, f'{program}_tabla_5.xlsx')
-        styled = pv.style.format(precision=2).background_gradient(cmap='RdYlGn', axis=None)
-        styled.to_excel(out_path, sheet_name='Tabla 5')
+            return 'Tabla 5', df.head(50), {'csv_fallback': True}
+        means = aggs.get('mean_obj_crit_per')
+        if means is None:
+            tmp = df[[per_col, obj_col, crit_col, score_col]].dropna()
+            means = tmp.groupby([obj_col, crit_col, per_col], observed=True)[score_col].mean()
+        pv = means.round(2).unstack(fill_value=np.nan)
+        # El gradiente se aplica al escribir (Formats de xlsxwriter, con
+        # Styler como plan B); aquí solo se computa el pivot.
         log.info(f'Table 5 generated for program: {program}')
+        return 'Tabla 5', pv, {'heatmap': True, 'styler_heatmap': True}
     except Exception as e:
         log.error(f'Error in Table 5: {e}')
 
 
-def table_6(df: pd.DataFrame, folder_path: str, program: str):
+def table_6(df: pd.DataFrame, resolved: ColumnMap, aggs: dict, program: str):
     """
     Tabla 6: Promedio por PERIODO (diagnóstico escritura).
     :param df: DataFrame filtered by program.
-    :param folder_path: Path to save the tables.
+    :param resolved: ColumnMap from _resolve_columns.
     :param program: The program name.
-    :return: None
+    :return: A (sheet_name, table, to_excel kwargs) tuple, or None on error.
     """
     try:
-        cols = df.columns
-        # detectar periodo/cohorte
-        per_col = next(
-            (c for c in cols if
-             c.strip().upper() == 'PERIODO' or 'cohorte' in c.lower() or c.lower().startswith('periodo')),
-            None
-        )
-        if per_col is None:
-            per_col = next(
-                (c for c in cols if 'semestre o ciclo' in c.lower() or c.strip().lower().startswith('semestre')), None)
-
-        # detectar PROMEDIO o usar Puntaje criterio
-        prom_col = next((c for c in cols if c.strip().upper() == 'PROMEDIO' or 'promedio escritura' in c.lower()), None)
-        score_col = next((c for c in cols if 'puntaje criterio' in c.lower()), None)
+        # periodo/cohorte; PROMEDIO o, en su defecto, Puntaje criterio
+        per_col = resolved.cohorte_o_periodo
+        prom_col = resolved.promedio
+        score_col = resolved.puntaje
 
         if per_col is None or (prom_col is None and score_col is None):
-            out_path = os.path.join(folder_path, f'{program}_tabla_6.xlsx')
-            with pd.ExcelWriter(out_path) as xw:
-                df.head(50).to_excel(xw, index=False, sheet_name='Fallback')
             log.warning(f'Table 6 fallback written (no period/score columns) for program: {program}')
-            return
+            return 'Tabla 6', df.head(50), {'csv_fallback': True}
 
         # Si no hay PROMEDIO, calculamos desde Puntaje criterio
         value_col = prom_col if prom_col is not None else score_col
@@ -458,70 +924,64 @@ def table_6(df: pd.DataFrame, folder_path: str, program: str):
         #     tmp = df[[per_col, value_col]].dropna()
 
         tmp = df[[per_col, value_col]].dropna()
-        tabla = tmp.groupby(per_col)[value_col].mean().round(2).reset_index()
+        tabla = tmp.groupby(per_col, observed=True)[value_col].mean().round(2).reset_index()
         tabla.columns = ['Periodo', 'Promedio']
 
-        out_path = os.path.join(folder_path, f'{program}_tabla_6.xlsx')
-        with pd.ExcelWriter(out_path) as xw:
-            tabla.to_excel(xw, index=False, sheet_name='Tabla 6')
         log.info(f'Table 6 generated for program: {program}')
+        return 'Tabla 6', tabla, {'index': False}
     except Exception as e:
         log.error(f'Error in Table 6: {e}')
 
 
-def table_7(df: pd.DataFrame, folder_path: str, program: str):
+def table_7(df: pd.DataFrame, resolved: ColumnMap, aggs: dict, program: str):
     """
     Tabla 7: Promedio por Criterios de Evaluación por Periodos Académicos (heatmap con Styler).
     :param df: DataFrame filtered by program.
-    :param folder_path: Path to save the tables.
+    :param resolved: ColumnMap from _resolve_columns.
+    :param aggs: Shared aggregates from _shared_aggregates.
     :param program: The program name.
-    :return: None
+    :return: A (sheet_name, table, to_excel kwargs) tuple, or None on error.
     """
     try:
-        cols = df.columns
-        per_col = next((c for c in cols if c.strip().lower().startswith(
-            'semestre') or 'semestre o ciclo' in c.lower() or c.lower().startswith('periodo')), None)
-        obj_col = next((c for c in cols if 'objetivo de aprendizaje' in c.lower()), None)
-        crit_col = next(
-            (c for c in cols if 'código y nombre del criterio' in c.lower() or 'nombre del criterio' in c.lower()),
-            None)
-        score_col = next((c for c in cols if 'puntaje criterio' in c.lower()), None)
+        per_col = resolved.periodo
+        obj_col = resolved.objetivo
+        crit_col = resolved.criterio
+        score_col = resolved.puntaje
         if per_col is None or obj_col is None or crit_col is None or score_col is None:
-            out_path = os.path.join(folder_path, f'{program}_tabla_7.xlsx')
-            with pd.ExcelWriter(out_path) as xw:
-                df.head(50).to_excel(xw, index=False, sheet_name='Datos')
             log.warning(f'Table 7 fallback written (column not found) for program: {program}')
-            return
-        tmp = df[[obj_col, crit_col, per_col, score_col]].dropna()
-        pv = pd.pivot_table(tmp, index=[obj_col, crit_col], columns=per_col, values=score_col, aggfunc='mean').round(2)
-        out_path = os.path.join(folder_path, f'{program}_tabla_7.xlsx')
-        styled = pv.style.format(precision=2).background_gradient(cmap='RdYlGn', axis=None)
-        styled.to_excel(out_path, sheet_name='Tabla 7')
+            return 'Tabla 7', df.head(50), {'csv_fallback': True}
+        # Misma agregación que la Tabla 5 (media por objetivo/criterio y
+        # periodo); el pivot equivale a un unstack del agregado compartido.
+        means = aggs.get('mean_obj_crit_per')
+        if means is None:
+            tmp = df[[obj_col, crit_col, per_col, score_col]].dropna()
+            means = tmp.groupby([obj_col, crit_col, per_col], observed=True)[score_col].mean()
+        pv = means.unstack().round(2)
         log.info(f'Table 7 generated for program: {program}')
+        return 'Tabla 7', pv, {'heatmap': True, 'styler_heatmap': True}
     except Exception as e:
         log.error(f'Error in Table 7: {e}')
 
 
-def table_8(df: pd.DataFrame, folder_path: str, program: str):
+def table_8(df: pd.DataFrame, resolved: ColumnMap, aggs: dict, program: str):
     """
     Tabla 8: Resultados (Promedio) por Competencia, por Cohortes (PERIODO) con columna 'Promedio'.
     :param df: DataFrame filtered by program.
-    :param folder_path: Path to save the tables.
+    :param resolved: ColumnMap from _resolve_columns.
     :param program: The program name.
-    :return: None
+    :return: A (sheet_name, table, to_excel kwargs) tuple, or None on error.
     """
     try:
-        cols = df.columns
-        coh_col = next((c for c in cols if c.strip().upper() == 'PERIODO' or 'cohorte' in c.lower()), None)
-        comp_col = next((c for c in cols if 'competencia' in c.lower()), None)
-        score_col = next((c for c in cols if 'puntaje criterio' in c.lower()), None)
+        coh_col = resolved.cohorte
+        comp_col = resolved.competencia
+        score_col = resolved.puntaje
         if coh_col is None or comp_col is None or score_col is None:
-            out_path = os.path.join(folder_path, f'{program}_tabla_8.xlsx')
-            with pd.ExcelWriter(out_path, engine='xlsxwriter') as xw:
-                df.head(50).to_excel(xw, index=False, sheet_name='Datos')
             log.warning(f'Table 8 fallback written (column not found) for program: {program}')
-            return
-        pv = (df.groupby([coh_col, comp_col])[score_col].mean().unstack())
+            return 'Tabla 8', df.head(50), {'csv_fallback': True}
+        means = aggs.get('mean_coh_comp')
+        if means is None:
+            means = df.groupby([coh_col, comp_col], observed=True)[score_col].mean()
+        pv = means.unstack()
         pv['Promedio'] = pv.mean(axis=1)
         pv = pv.round(2)
         # Agregar fila de promedio general
@@ -529,156 +989,285 @@ def table_8(df: pd.DataFrame, folder_path: str, program: str):
         mean_row.index = ['Promedio']
         out_df = pd.concat([pv, mean_row])
         out_df.index = [f'Cohorte {idx}' if idx != 'Promedio' else idx for idx in out_df.index]
-        out_path = os.path.join(folder_path, f'{program}_tabla_8.xlsx')
-        out_df.to_excel(out_path)
         log.info(f'Table 8 generated for program: {program}')
+        return 'Tabla 8', out_df, {}
     except Exception as e:
         log.error(f'Error in Table 8: {e}')
 
 
-def table_9(df: pd.DataFrame, folder_path: str, program: str):
+def table_9(df: pd.DataFrame, resolved: ColumnMap, aggs: dict, program: str):
     """
     Tabla 9: Resultados (Promedio μ y Desv. σ) por Objetivo de aprendizaje, por Cohortes.
     :param df: DataFrame filtered by program.
-    :param folder_path: Path to save the tables.
+    :param resolved: ColumnMap from _resolve_columns.
     :param program: The program name.
-    :return: None
+    :return: A (sheet_name, table, to_excel kwargs) tuple, or None on error.
     """
     try:
-        cols = df.columns
-        # Buscar una columna de cohorte/periodo de ingreso razonable
-        coh_col = next(
-            (c for c in cols if c.strip().upper() in {'PERIODO', 'COHORTE'}
-             or 'cohorte' in c.lower()
-             or c.lower().startswith('periodo')),
-            None
-        )
-        if coh_col is None:
-            # usa el periodo de aplicación si no hay cohorte de ingreso
-            coh_col = next(
-                (c for c in cols if 'semestre o ciclo' in c.lower() or c.strip().lower().startswith('semestre')), None)
-
-        obj_col = next((c for c in cols if 'objetivo de aprendizaje' in c.lower()), None)
-        score_col = next((c for c in cols if 'puntaje criterio' in c.lower()), None)
+        # Cohorte de ingreso; si no existe, el periodo de aplicación
+        coh_col = resolved.cohorte_o_periodo
+        obj_col = resolved.objetivo
+        score_col = resolved.puntaje
 
         if coh_col is None or obj_col is None or score_col is None:
-            out_path = os.path.join(folder_path, f'{program}_tabla_9.xlsx')
-            with pd.ExcelWriter(out_path) as xw:
-                df.head(50).to_excel(xw, index=False, sheet_name='Datos')
             log.warning(f'Table 9 fallback written (column not found) for program: {program}')
-            return
-
-        tmp = df[[coh_col, obj_col, score_col]].dropna()
-        mean_pv = tmp.pivot_table(index=coh_col, columns=obj_col, values=score_col, aggfunc='mean')
-        std_pv = tmp.pivot_table(index=coh_col, columns=obj_col, values=score_col, aggfunc='std')
-
-        # Intercalar columnas μ y σ
-        cols_order = []
-        for obj in mean_pv.columns:
-            cols_order.extend([(obj, 'μ'), (obj, 'σ')])
-
-        out_cols = pd.MultiIndex.from_tuples(cols_order)
-        out_df = pd.DataFrame(index=mean_pv.index, columns=out_cols, dtype=float)
-        for obj in mean_pv.columns:
-            out_df[(obj, 'μ')] = mean_pv[obj]
-            out_df[(obj, 'σ')] = std_pv[obj]
+            return 'Tabla 9', df.head(50), {'csv_fallback': True}
+
+        # Un solo groupby con ['mean','std'] en vez de dos pivot_table
+        stats = aggs.get('stats_coh_obj')
+        if stats is None:
+            tmp = df[[coh_col, obj_col, score_col]].dropna()
+            stats = tmp.groupby([coh_col, obj_col], observed=True)[score_col].agg(['mean', 'std'])
+        mean_pv = stats['mean'].unstack()
+        std_pv = stats['std'].unstack()
+
+        # Intercalar columnas μ y σ con un solo concat: cada setitem del
+        # esquema anterior reconstruía los bloques del DataFrame entero
+        mean_pv.columns = pd.MultiIndex.from_product([mean_pv.columns, ['μ']])
+        std_pv.columns = pd.MultiIndex.from_product([std_pv.columns, ['σ']])
+        out_df = pd.concat([mean_pv, std_pv], axis=1).sort_index(
+            axis=1, level=0, sort_remaining=False)
 
         out_df = out_df.sort_index().round(2)
         avg = out_df.mean(axis=0).to_frame().T
         avg.index = ['Promedio']
         final_df = pd.concat([out_df, avg])
 
-        out_path = os.path.join(folder_path, f'{program}_tabla_9.xlsx')
-        with pd.ExcelWriter(out_path) as xw:
-            final_df.to_excel(xw, sheet_name='Tabla 9')
         log.info(f'Table 9 generated for program: {program}')
+        return 'Tabla 9', final_df, {}
     except Exception as e:
         log.error(f'Error in Table 9: {e}')
 
 
 # ================================================ GRAPH GENERATION ==================================================
 
-def generate_graphs(pdf: pd.DataFrame, folder_path: str, program: str):
-    df = pdf.drop(columns=['programa']).copy()
-    graph_1(df, folder_path, program)
-    graph_2(df, folder_path, program)
+# Figura compartida entre todos los graph_N: crear un Figure nuevo por
+# gráfica paga construcción del lienzo Agg y copias de rcParams cada vez;
+# aquí solo se limpia el eje y se reutiliza.
+_FIG = None
+_AX = None
+
+# Opciones de codificación PNG vía Pillow (ver _save_png): zlib nivel 2
+# con filtro SUB fijo (compress_type=1) en lugar de la búsqueda
+# adaptativa de filtros; en imágenes de barras con grandes zonas planas
+# el filtro SUB gana casi siempre, así que fijarlo ahorra la búsqueda
+# sin apenas crecer el archivo.
+_PNG_PIL_KWARGS = {'compress_level': 2, 'compress_type': 1, 'optimize': False}
 
 
-def graph_1(df: pd.DataFrame, folder_path: str, program: str):
+def _get_fig_ax(figsize: tuple):
+    """
+    Return the shared (Figure, Axes) pair, cleared and resized.
+    :param figsize: Figure size in inches, as (width, height).
+    :return: The shared Figure and its single Axes.
+    """
+    global _FIG, _AX
+    if _FIG is None:
+        _FIG, _AX = plt.subplots(figsize=figsize)
+        _FIG.set_dpi(150)  # Resolución de reporte, aplicada por print_png
+    else:
+        _FIG.set_size_inches(*figsize)
+        _AX.clear()
+    return _FIG, _AX
+
+
+def _encode_png(buf: bytes, size: tuple, out_path: str):
+    """
+    Compress a snapshotted RGBA buffer to PNG with Pillow. Runs on the
+    I/O pool: zlib releases the GIL, so the previous figure's encoding
+    overlaps the next figure's pandas/draw work.
+    :param buf: Raw RGBA bytes copied from the Agg canvas.
+    :param size: (width, height) of the buffer in pixels.
+    :param out_path: Destination .png path.
+    :return: None
+    """
+    from PIL import Image
+    img = Image.frombuffer('RGBA', size, buf, 'raw', 'RGBA', 0, 1)
+    img.save(out_path, format='PNG', **_PNG_PIL_KWARGS)
+
+
+def _save_png(fig, out_path: str):
+    """
+    Encode the shared figure's PNG off the render thread. The RGBA
+    buffer is snapshotted right after draw, so the shared figure can be
+    cleared and reused for the next graph while Pillow compresses this
+    one in the background.
+    :param fig: The figure to save (normally the shared _FIG).
+    :param out_path: Destination .png path.
+    :return: A Future for the pending encode, or None if written inline.
+    """
+    try:
+        from PIL import Image  # noqa: F401 -- comprobar ANTES de encolar
+        fig.canvas.draw()
+        size = fig.canvas.get_width_height()
+        buf = bytes(fig.canvas.buffer_rgba())
+        return _io_pool().submit(_encode_png, buf, size, out_path)
+    except (AttributeError, ImportError):
+        # Sin Pillow o sin buffer RGBA expuesto: codificación en línea
+        try:
+            fig.canvas.draw()
+            try:
+                # zlib nivel 3 sin búsqueda de filtros: en gráficas de
+                # barras (grandes zonas planas) codifica varias veces más
+                # rápido que el nivel 6 por defecto, con tamaño similar.
+                fig.canvas.print_png(out_path, pil_kwargs=_PNG_PIL_KWARGS)
+            except TypeError:
+                # print_png sin soporte de pil_kwargs (Matplotlib antiguo)
+                fig.canvas.print_png(out_path)
+        except AttributeError:
+            # Canvas sin print_png (backend no-Agg): ruta estándar
+            fig.savefig(out_path, dpi=150)
+        return None
+
+
+def _counts_by_key(tmp: pd.DataFrame, key_col: str) -> pd.Series:
+    """
+    Count rows per key with integer codes + np.bincount: one branchless
+    C pass instead of a groupby hash table. Categorical keys reuse their
+    existing codes, so not even the factorize hash is paid.
+    :param tmp: Frame already reduced to the relevant (deduplicated) rows.
+    :param key_col: The key column to count by.
+    :return: Counts indexed by the sorted observed key values.
+    """
+    keys = tmp[key_col]
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        codes = keys.cat.codes.to_numpy()
+        uniques = keys.cat.categories
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        # Quedarse con las categorías presentes (observed=True)
+        mask = counts > 0
+        return pd.Series(counts[mask], index=uniques[mask])
+    codes, uniques = pd.factorize(keys, sort=True)
+    return pd.Series(np.bincount(codes[codes >= 0], minlength=len(uniques)),
+                     index=uniques)
+
+
+def generate_graphs(pdf: pd.DataFrame, folder_path: str, program: str):
+    # Resolver las columnas UNA sola vez con el mismo ColumnMap que usan
+    # las tablas; cada graph_N recibía el mismo DataFrame y repetía los
+    # mismos escaneos de nombres de columna.
+    cmap = _resolve_columns(pdf)
+    futures = (graph_1(pdf, folder_path, program, cmap.periodo, cmap.estudiante),
+               graph_2(pdf, folder_path, program, cmap.cohorte, cmap.estudiante))
+    # Esperar las codificaciones pendientes: la figura 1 se comprime
+    # mientras la figura 2 se calcula y dibuja
+    for future in futures:
+        if future is not None:
+            try:
+                future.result()
+            except Exception as e:
+                log.error(f'Error writing graph PNG for program {program}: {e}')
+
+
+def graph_1(df: pd.DataFrame, folder_path: str, program: str, per_col, student_col):
     """
     Generate Graph 1: Number of evaluations per period (unique students).
     :param df: DataFrame filtered by program.
     :param folder_path: Path to save the graphs.
     :param program: The program name.
-    :return: None
+    :param per_col: Resolved period column name, or None.
+    :param student_col: Resolved student-code column name, or None.
+    :return: A Future for the pending PNG encode, or None.
     """
-    # localizar columnas
-    cols = df.columns
-    per_col = next((c for c in cols if
-                    c.strip().lower().startswith('semestre') or 'semestre o ciclo' in c.lower() or c.lower().startswith(
-                        'periodo')), None)
-    student_col = next((c for c in cols if 'código del estudiante' in c.lower() or c.lower() == 'codigo'), None)
     if per_col is None or student_col is None:
-        # Fallback simple
-        fig, ax = plt.subplots(figsize=(8, 6))
-        ax.text(0.5, 0.5, 'No hay columnas de periodo/estudiante', ha='center', va='center')
-        ax.axis('off')
-    else:
-        tmp = df[[per_col, student_col]].dropna().drop_duplicates()
-        counts = tmp.groupby(per_col)[student_col].nunique().sort_index()
-        fig, ax = plt.subplots(figsize=(10, 6))
-        bars = ax.bar(range(len(counts)), counts.values)
-        ax.set_xticks(range(len(counts)))
-        ax.set_xticklabels(counts.index.astype(str))
-        ax.set_title('Número de evaluaciones AOL MM')
-        ax.set_xlabel('Periodo - semestre')
-        ax.set_ylabel('Número de estudiantes evaluados en AOL MM')
-        # Etiquetas encima
-        for rect, val in zip(bars, counts.values):
-            ax.text(rect.get_x() + rect.get_width() / 2, rect.get_height() + 0.5, f"{int(val)}", ha='center',
-                    va='bottom')
-        ax.margins(y=0.1)
-        fig.tight_layout()
+        # Sin columnas no hay nada que graficar; codificar un PNG de
+        # 'sin datos' por programa solo gasta tiempo y disco
+        log.warning(f'Graph 1 skipped (no period/student columns) for program: {program}')
+        return
+    tmp = df[[per_col, student_col]].dropna().drop_duplicates()
+    # Sobre pares deduplicados, nunique por periodo == tamaño del grupo;
+    # el conteo corre como bincount sobre códigos enteros
+    counts = _counts_by_key(tmp, per_col)
+    if counts.empty:
+        log.warning(f'Graph 1 skipped (no data) for program: {program}')
+        return
+    fig, ax = _get_fig_ax((10, 6))
+    bars = ax.bar(range(len(counts)), counts.values)
+    ax.set_xticks(range(len(counts)))
+    ax.set_xticklabels(counts.index.astype(str))
+    ax.set_title('Número de evaluaciones AOL MM')
+    ax.set_xlabel('Periodo - semestre')
+    ax.set_ylabel('Número de estudiantes evaluados en AOL MM')
+    # Etiquetas encima: bar_label procesa el contenedor completo de una
+    # vez, sin las tres llamadas get_* por barra del bucle clásico
+    try:
+        ax.bar_label(bars, fmt='%d', padding=2)
+    except AttributeError:
+        # Matplotlib < 3.4 no trae bar_label: etiquetas y posiciones
+        # precalculadas en numpy (las barras están centradas en 0..n-1),
+        # sin llamadas get_* ni format por barra
+        vals = counts.to_numpy()
+        labels = np.char.mod('%d', vals.astype(np.int64))
+        for x, y, lbl in zip(np.arange(len(vals)), vals + 0.5, labels):
+            ax.text(x, y, lbl, ha='center', va='bottom')
+    ax.margins(y=0.1)
+    # Márgenes fijos en vez de tight_layout: el motor de layout re-mide
+    # todos los artistas en cada guardado y aquí el diseño es estable.
+    fig.subplots_adjust(left=0.1, right=0.95, top=0.92, bottom=0.12)
     out_path = os.path.join(folder_path, f'{program}_figura_1.png')
-    fig.savefig(out_path, dpi=150)
-    plt.close(fig)
+    future = _save_png(fig, out_path)
     log.info(f'Graph 1 generated for program: {program}')
+    return future
 
 
-def graph_2(df: pd.DataFrame, folder_path: str, program: str):
+def graph_2(df: pd.DataFrame, folder_path: str, program: str, coh_col, student_col):
     """
     Generate Graph 2: Number of evaluations by cohort of entry (PERIODO).
     :param df: DataFrame filtered by program.
     :param folder_path: Path to save the graphs.
     :param program: The program name.
-    :return: None
+    :param coh_col: Resolved cohort column name, or None.
+    :param student_col: Resolved student-code column name, or None.
+    :return: A Future for the pending PNG encode, or None.
     """
-    cols = df.columns
-    coh_col = next((c for c in cols if c.strip().upper() == 'PERIODO' or 'cohorte' in c.lower()), None)
-    student_col = next((c for c in cols if 'código del estudiante' in c.lower() or c.lower() == 'codigo'), None)
-    fig, ax = plt.subplots(figsize=(10, 6))
-    if coh_col and student_col:
-        tmp = df[[coh_col, student_col]].dropna().drop_duplicates()
-        counts = tmp.groupby(coh_col)[student_col].nunique().sort_index()
-        bars = ax.barh(range(len(counts)), counts.values)
-        ax.set_yticks(range(len(counts)))
-        ax.set_yticklabels([f'Cohorte {c}' for c in counts.index])
-        ax.invert_yaxis()
-        ax.set_xlabel('Número de estudiantes evaluados AOL MM')
-        ax.set_title('Estudiantes evaluados en AOL desagregado por cohorte de ingreso')
-        for rect, val in zip(bars, counts.values):
-            ax.text(rect.get_width() + 0.5, rect.get_y() + rect.get_height() / 2, f"{int(val)}", va='center')
-        fig.tight_layout()
-    else:
-        ax.text(0.5, 0.5, 'No hay columnas PERIODO/Código estudiante', ha='center', va='center')
-        ax.axis('off')
+    if not (coh_col and student_col):
+        log.warning(f'Graph 2 skipped (no cohort/student columns) for program: {program}')
+        return
+    tmp = df[[coh_col, student_col]].dropna().drop_duplicates()
+    # Igual que en graph_1: bincount sobre los pares únicos == nunique
+    counts = _counts_by_key(tmp, coh_col)
+    if counts.empty:
+        log.warning(f'Graph 2 skipped (no data) for program: {program}')
+        return
+    fig, ax = _get_fig_ax((10, 6))
+    vals = counts.to_numpy()
+    ys = np.arange(len(vals))
+    # Una sola PolyCollection en vez de un Rectangle por barra: las
+    # cohortes entran al renderer como un único artista con una única
+    # transformación, no N patches independientes. Misma geometría que
+    # barh (alto 0.8, ancladas en x=0).
+    half = 0.4
+    x0 = np.zeros(len(vals))
+    verts = np.stack([
+        np.stack([x0, ys - half], axis=1),
+        np.stack([vals, ys - half], axis=1),
+        np.stack([vals, ys + half], axis=1),
+        np.stack([x0, ys + half], axis=1),
+    ], axis=1)
+    color = plt.rcParams['axes.prop_cycle'].by_key()['color'][0]
+    ax.add_collection(PolyCollection(verts, facecolors=color))
+    ax.autoscale_view()
+    ax.set_xlim(left=0)
+    ax.set_yticks(ys)
+    ax.set_yticklabels([f'Cohorte {c}' for c in counts.index])
+    ax.invert_yaxis()
+    ax.set_xlabel('Número de estudiantes evaluados AOL MM')
+    ax.set_title('Estudiantes evaluados en AOL desagregado por cohorte de ingreso')
+    # Etiquetas con strings y centros vectorizados de antemano
+    labels = np.char.mod('%d', vals.astype(np.int64))
+    for x, y, lbl in zip(vals + 0.5, ys, labels):
+        ax.text(x, y, lbl, va='center')
+    # Márgenes fijos (izquierda más ancha para las etiquetas 'Cohorte N')
+    fig.subplots_adjust(left=0.18, right=0.95, top=0.92, bottom=0.12)
     out_path = os.path.join(folder_path, f'{program}_figura_2.png')
-    fig.savefig(out_path, dpi=150)
-    plt.close(fig)
+    future = _save_png(fig, out_path)
     log.info(f'Graph 2 generated for program: {program}')
+    return future
 
 
 # ================================================ ENTRY POINT ========================================================
 
 if __name__ == '__main__':
+    import multiprocessing
+    multiprocessing.freeze_support()
     generate_tables_graphs()